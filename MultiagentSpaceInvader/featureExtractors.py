@@ -0,0 +1,179 @@
+"""
+featureExtractors.py
+
+Turns batches of GameStates into rows of numbers, so that an evaluation
+function can score all the leaves below a search node in one call instead of
+walking the agent lists of every state on its own.
+
+An evaluation function marked with @vectorized takes such a feature matrix
+(a list of rows laid out as FEATURE_NAMES, one per state) and returns the list
+of their scores. Any MultiAgentSearchAgent accepts one as its evalFn, e.g.
+-a evalFn=featureExtractors.linearEvaluationFunction
+"""
+
+from game import AgentKinds
+
+FEATURE_NAMES = [
+    'score',
+    'win',
+    'lose',
+    'shipX',
+    'numAsteroids',
+    'asteroidDistance', # columns to walk to the closest asteroid the spaceship can shoot
+    'numEnemies',
+    'enemyDistance',    # manhattan distance to the closest enemy
+    'threatsLeft',      # enemy bullets in the column left of the spaceship,
+    'threatsHere',      # in its own column
+    'threatsRight',     # and right of it
+    'closestThreat',    # rows between the spaceship and the closest bullet coming down on it
+    'numShipBullets',
+]
+FEATURES = dict([(name, i) for i, name in enumerate(FEATURE_NAMES)])
+
+
+def vectorized(evaluationFunction):
+    """
+    Marks evaluationFunction as taking a feature matrix and returning a list
+    of scores, rather than taking a single GameState.
+    """
+    evaluationFunction.isVectorized = True
+    return evaluationFunction
+
+def isVectorized(evaluationFunction):
+    return getattr(evaluationFunction, 'isVectorized', False)
+
+class StateEvaluationFunction:
+    """
+    The one-GameState-at-a-time version of a vectorized evaluation function.
+    A class rather than a closure, so that agents using it can be pickled
+    (spaceship.py --workers sends them to other processes).
+    """
+    def __init__(self, evaluationFunction):
+        self.evaluationFunction = evaluationFunction
+
+    def __call__(self, gameState):
+        return self.evaluationFunction(getFeatureMatrix([gameState]))[0]
+
+
+class FeatureExtractor:
+    """
+    Extracts FEATURE_NAMES from the states of one layout. What only depends
+    on the layout (the spaceship's row and the columns it can fire from) is
+    worked out once.
+    """
+
+    def __init__(self, gameState):
+        layout = gameState.data.layout
+        walls = layout.walls
+        self.height = walls.height
+        shipX, shipY = gameState.getSpaceShipPosition()
+        shipX, self.shipY = int(shipX), int(shipY)
+        startY = self.shipY - 1 # where the bullets are created
+
+        # the stretch of the spaceship's row between the walls around it
+        left = shipX
+        while left > 0 and not walls[left - 1][self.shipY]: left -= 1
+        right = shipX
+        while right < walls.width - 1 and not walls[right + 1][self.shipY]: right += 1
+        self.columns = range(left, right + 1)
+
+        # for every column, the rows a bullet flies through before leaving the
+        # screen (the first wall above startY stops it)
+        self.openRows = {}
+        for x in self.columns:
+            y = startY - 1
+            while y >= 0 and not walls[x][y]: y -= 1
+            self.openRows[x] = ((1 << max(startY, 0)) - 1) & ~((1 << (y + 1)) - 1)
+
+        self.noAsteroidDistance = layout.width
+        self.noEnemyDistance = layout.width + layout.height
+        self.noThreatDistance = layout.height
+
+    def getFeatures(self, gameState):
+        data = gameState.data
+        agentStates = data.agentStates
+        shipX = int(agentStates[0].configuration.pos[0])
+        shipY = self.shipY
+
+        enemyDistance = self.noEnemyDistance
+        enemies = data.getAgentIndices(AgentKinds.ENEMY)
+        for index in enemies:
+            x, y = agentStates[index].configuration.pos
+            enemyDistance = min(enemyDistance, abs(x - shipX) + abs(y - shipY))
+
+        threats = [0, 0, 0]
+        closestThreat = self.noThreatDistance
+        for index in data.getAgentIndices(AgentKinds.DOWN_BULLET):
+            x, y = agentStates[index].configuration.pos
+            column = int(x) - shipX + 1
+            if 0 <= column <= 2 and y <= shipY:
+                threats[column] += 1
+                if column == 1: closestThreat = min(closestThreat, shipY - int(y))
+
+        return [
+            data.score,
+            1 if data._win else 0,
+            1 if data._lose else 0,
+            shipX,
+            data.asteroid.count(),
+            self.getAsteroidDistance(shipX, data.asteroid.bits),
+            len(enemies),
+            enemyDistance,
+            threats[0],
+            threats[1],
+            threats[2],
+            closestThreat,
+            len(data.getAgentIndices(AgentKinds.UP_BULLET)),
+        ]
+
+    def getAsteroidDistance(self, shipX, asteroidBits):
+        columns = self.columns
+        for distance in range(len(columns)):
+            for x in (shipX - distance, shipX + distance):
+                if x in columns and (asteroidBits >> (x * self.height)) & self.openRows[x]:
+                    return distance
+        return self.noAsteroidDistance
+
+    def getFeatureMatrix(self, gameStates):
+        getFeatures = self.getFeatures
+        return [getFeatures(gameState) for gameState in gameStates]
+
+
+_extractors = {} # (width, height, wall bits, spaceship start) -> FeatureExtractor
+
+def getFeatureExtractor(gameState):
+    """
+    Returns the (shared) FeatureExtractor of the layout of gameState. They are
+    keyed by what they are built from, not by the layout object, so every copy
+    of a layout shares one.
+    """
+    layout = gameState.data.layout
+    key = (layout.width, layout.height, layout.walls.bits, gameState.data.agentStates[0].start.pos)
+    extractor = _extractors.get(key)
+    if extractor == None:
+        extractor = _extractors[key] = FeatureExtractor(gameState)
+    return extractor
+
+def getFeatureMatrix(gameStates):
+    """
+    Returns one row of FEATURE_NAMES per state. The states must share a layout.
+    """
+    if len(gameStates) == 0: return []
+    return getFeatureExtractor(gameStates[0]).getFeatureMatrix(gameStates)
+
+
+LINEAR_WEIGHTS = {
+    'score': 1.0,
+    'asteroidDistance': -10.0,
+    'enemyDistance': -1.0,
+    'threatsHere': -50.0,
+}
+
+@vectorized
+def linearEvaluationFunction(features):
+    """
+    An example vectorized evaluation function: a weighted sum of the features
+    in LINEAR_WEIGHTS.
+    """
+    weights = [(FEATURES[name], weight) for name, weight in LINEAR_WEIGHTS.items()]
+    return [sum([row[i] * weight for i, weight in weights]) for row in features]
@@ -1,9 +1,20 @@
-import pygame
 from util import *
 import copy
-
-clock = pygame.time.Clock()
-pygame.init()
+import time
+import searchHooks
+
+# pygame is only imported (and initialized) once a game with a window runs,
+# so that headless games never touch it.
+pygame = None
+clock = None
+
+def initPygame():
+    global pygame, clock
+    if pygame == None:
+        import pygame as pygameModule
+        pygameModule.init()
+        clock = pygameModule.time.Clock()
+        pygame = pygameModule
 
 class Directions:
     LEFT = "Left"
@@ -75,6 +86,18 @@ class Configuration:
         return Configuration((x+dx, y+dy)) #, direction
 
 
+class AgentKinds:
+    """
+    Integer codes for the kinds of agents, stored as AgentState.kind.
+    """
+    SHIP = 0
+    ENEMY = 1
+    UP_BULLET = 2
+    DOWN_BULLET = 3
+
+    ALL = (SHIP, ENEMY, UP_BULLET, DOWN_BULLET)
+
+
 class AgentState:
     """
     AgentStates hold the state of an agent (configuration, isSpaceShip, isUpBullet, isDownBullet, etc).
@@ -85,6 +108,10 @@ class AgentState:
         self.isSpaceShip = isSpaceShip
         self.isUpBullet = isUpBullet
         self.isDownBullet = isDownBullet
+        if isSpaceShip: self.kind = AgentKinds.SHIP
+        elif isUpBullet: self.kind = AgentKinds.UP_BULLET
+        elif isDownBullet: self.kind = AgentKinds.DOWN_BULLET
+        else: self.kind = AgentKinds.ENEMY
 
     def getPosition(self):
         return self.configuration.getPosition()
@@ -96,6 +123,23 @@ class AgentState:
         
         return state
 
+    def freeze(self):
+        """
+        Makes this agent state read-only; copy() still returns a writable state.
+        """
+        self.__class__ = FrozenAgentState
+
+
+class FrozenAgentState(AgentState):
+    """
+    An AgentState that is part of an agent's observation and cannot be changed.
+    """
+    def __setattr__(self, name, value):
+        raise Exception("Observations are read-only: can't set %s of an agent state" % name)
+
+    def freeze(self):
+        pass
+
 
 class Grid:
     """
@@ -127,6 +171,7 @@ class Grid:
 
     def __eq__(self, other):
         if other == None: return False
+        if isinstance(other, BitGrid): return other == self
         return self.data == other.data
 
     def __hash__(self):
@@ -152,6 +197,13 @@ class Grid:
         g.data = self.data
         return g
 
+    def freeze(self):
+        """
+        Makes this grid read-only (columns become tuples); copy() still returns a writable grid.
+        """
+        if type(self.data) is not tuple:
+            self.data = tuple([tuple(x) for x in self.data])
+
     def count(self, item =True ):
         return sum([x.count(item) for x in self.data])
 
@@ -210,6 +262,171 @@ class Grid:
                 bools.append(False)
         return bools
 
+class BitGrid:
+    """
+    A drop-in replacement for Grid backed by a single python int used as a bitboard.
+    Cell (x, y) lives at bit x * height + y, which is the same cell order used by
+    Grid.packBits and Grid.__hash__, so both kinds of grid hash alike.
+
+    Data is still accessed via grid[x][y]; grid[x] returns a light column view
+    that reads and writes bits of its parent. Since the bits are an immutable int,
+    copy() is O(1), count() is a popcount and asList() only visits set bits.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.bits = (1 << (width * height)) - 1 if initialValue else 0
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def fromGrid(grid):
+        """
+        Builds a BitGrid holding the same cells as a list-of-lists Grid.
+        """
+        g = BitGrid(grid.width, grid.height)
+        for x, y in grid.asList():
+            g.bits |= 1 << (x * grid.height + y)
+        return g
+
+    fromGrid = staticmethod(fromGrid)
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.width:
+            if -self.width <= i < 0: i += self.width
+            else: raise IndexError('BitGrid column index out of range')
+        return _BitGridColumn(self, i * self.height)
+
+    def __setitem__(self, key, item):
+        column = self[key]
+        for y in range(self.height):
+            column[y] = item[y]
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield _BitGridColumn(self, x * self.height)
+
+    def __len__(self):
+        return self.width
+
+    def __str__(self):
+        out = [[str(self[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        if isinstance(other, BitGrid):
+            return self.bits == other.bits and self.width == other.width and self.height == other.height
+        if isinstance(other, Grid):
+            return other.width == self.width and other.height == self.height and other.asList() == self.asList()
+        return False
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def copy(self):
+        g = BitGrid.__new__(BitGrid)
+        g.CELLS_PER_INT = self.CELLS_PER_INT
+        g.width = self.width
+        g.height = self.height
+        g.bits = self.bits
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # ints are immutable so there is nothing to share: writes made through the
+        # copy never leak back into this grid (which is what every caller wants).
+        return self.copy()
+
+    def freeze(self):
+        """
+        Makes this grid read-only; copy() still returns a writable grid.
+        """
+        self.__class__ = FrozenBitGrid
+
+    def count(self, item =True ):
+        ones = bin(self.bits).count('1')
+        if item: return ones
+        return self.width * self.height - ones
+
+    def asList(self, key = True):
+        if not key:
+            return Grid.asList(self, False)
+        list = []
+        bits = self.bits
+        height = self.height
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            list.append( (index // height, index % height) )
+            bits ^= low
+        return list
+
+    def packBits(self):
+        return Grid.packBits(self)
+
+    def _cellIndexToPosition(self, index):
+        x = index // self.height
+        y = index % self.height
+        return x, y
+
+    def _unpackBits(self, bits):
+        Grid._unpackBits(self, bits)
+
+    def _unpackInt(self, packed, size):
+        return Grid._unpackInt(self, packed, size)
+
+
+class FrozenBitGrid(BitGrid):
+    """
+    A BitGrid that is part of an agent's observation and cannot be changed.
+    """
+    def __setattr__(self, name, value):
+        raise Exception("Observations are read-only: can't change a grid")
+
+    def freeze(self):
+        pass
+
+
+class _BitGridColumn:
+    """
+    A view of column x of a BitGrid, so that grid[x][y] reads and writes single bits.
+    """
+    __slots__ = ('grid', 'offset')
+
+    def __init__(self, grid, offset):
+        self.grid = grid
+        self.offset = offset
+
+    def _row(self, y):
+        # rows index like list items: negative rows count from the end
+        height = self.grid.height
+        if 0 <= y < height: return y
+        if -height <= y < 0: return y + height
+        raise IndexError('BitGrid row index out of range')
+
+    def __getitem__(self, y):
+        y = self._row(y)
+        return (self.grid.bits >> (self.offset + y)) & 1 == 1
+
+    def __setitem__(self, y, item):
+        y = self._row(y)
+        if item: self.grid.bits |= 1 << (self.offset + y)
+        else: self.grid.bits &= ~(1 << (self.offset + y))
+
+    def __iter__(self):
+        column = self.grid.bits >> self.offset
+        for y in range(self.grid.height):
+            yield (column >> y) & 1 == 1
+
+    def __len__(self):
+        return self.grid.height
+
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -270,32 +487,37 @@ class Actions:
     
     actionToVector = staticmethod(actionToVector)
 
+    # actions an agent of each kind may take, before walls are taken into account
+    _kindActions = {
+        AgentKinds.SHIP: (Directions.LEFT, Directions.RIGHT, Directions.FIRE, Directions.STOP),
+        AgentKinds.UP_BULLET: (Directions.UP, Directions.STOP),
+        AgentKinds.DOWN_BULLET: (Directions.DOWN, Directions.STOP),
+        AgentKinds.ENEMY: (Directions.LEFT, Directions.RIGHT, Directions.FIRE, Directions.STOP, Directions.UP, Directions.DOWN)
+    }
+
     def getPossibleActions(gameState, agentIndex, walls): 
         agentState = gameState.getAgentState(agentIndex)
-        width = gameState.data.layout.width
-        height = gameState.data.layout.height
-        possible = []
-        actions = []
-        if(agentState.isSpaceShip):
-            actions = [Directions.LEFT, Directions.RIGHT, Directions.FIRE, Directions.STOP]
-        elif (agentState.isUpBullet):
-            actions = [Directions.UP, Directions.STOP]
-        elif (agentState.isDownBullet):
-            actions = [Directions.DOWN, Directions.STOP]
-        else: # enemy
-            actions = [Directions.LEFT, Directions.RIGHT, Directions.FIRE, Directions.STOP, Directions.UP, Directions.DOWN]
         x, y = agentState.configuration.pos
-        x_int, y_int = int(x + 0.5), int(y + 0.5)
+        return list(Actions.getPossibleActionsAt(agentState.kind, int(x + 0.5), int(y + 0.5), walls))
+
+    getPossibleActions = staticmethod(getPossibleActions)
 
-        for act in actions:
+    def getPossibleActionsAt(agentKind, x_int, y_int, walls):
+        """
+        Returns the tuple of actions of an agent of agentKind in cell (x_int, y_int)
+        that do not run into a wall. Cells outside of walls count as walls.
+        """
+        possible = []
+        for act in Actions._kindActions[agentKind]:
             dx, dy = Actions._actions[act][0]
             next_y = y_int + dy
             next_x = x_int + dx
+            if not (0 <= next_x < walls.width and 0 <= next_y < walls.height): continue
             if not walls[next_x][next_y]: possible.append(act) 
 
-        return possible
+        return tuple(possible)
 
-    getPossibleActions = staticmethod(getPossibleActions)
+    getPossibleActionsAt = staticmethod(getPossibleActionsAt)
 
     def getSuccessors(position, action, speed=1.0):
         dx, dy = Actions.actionToVector(action, speed)
@@ -307,6 +529,47 @@ class Actions:
 
 
 
+ZOBRIST_MASK = (1 << 64) - 1
+ZOBRIST_ASTEROID = len(AgentKinds.ALL) # agents use their AgentKinds code
+_zobristKeys = {}
+
+def zobristKey(kind, pos, start=None):
+    """
+    Returns the 64-bit Zobrist key of an object of the given kind at pos. Agents
+    also pass the cell they started from (where enemies respawn), which tells
+    apart agents of the same kind that swapped places.
+
+    Keys come from a splitmix64 mix of (kind, x, y, start) rather than a random
+    table, so they do not depend on the board size and are the same in every process.
+    """
+    entry = (kind, pos, start)
+    key = _zobristKeys.get(entry)
+    if key is None:
+        x, y = pos
+        key = _splitMix64(kind << 40 | (int(x) & 0xFFFFF) << 20 | (int(y) & 0xFFFFF))
+        if start != None:
+            startX, startY = start
+            key = _splitMix64(key ^ ((int(startX) & 0xFFFFF) << 20 | (int(startY) & 0xFFFFF)))
+        _zobristKeys[entry] = key
+    return key
+
+def _splitMix64(z):
+    z = (z + 0x9E3779B97F4A7C15) & ZOBRIST_MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & ZOBRIST_MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & ZOBRIST_MASK
+    return z ^ (z >> 31)
+
+# kinds of entries in the undo journal of GameStateData
+JOURNAL_CONFIGURATION = 0
+JOURNAL_SLOT = 1
+JOURNAL_ADD = 2
+JOURNAL_REMOVE = 3
+JOURNAL_KILLED = 4
+
+def agentZobristKey(agentState):
+    return zobristKey(agentState.kind, agentState.configuration.pos, agentState.start.pos)
+
+
 class GameStateData:
     
     def __init__(self, prevState = None):
@@ -314,15 +577,29 @@ class GameStateData:
         Generates a new data packet by copying information from its predecessor.
         """
         if prevState != None:
-            self.asteroid = prevState.asteroid.shallowCopy()
-            self.walls = prevState.walls.shallowCopy()
-            self.enemies = prevState.enemies.copy()
-
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            # Everything is shared with the predecessor until it is written:
+            # the asteroid grid and the killed flags are replaced (never edited)
+            # when they change, walls and enemies are static, and agent states
+            # are only copied by getAgentStateForWrite.
+            self.asteroid = prevState.asteroid
+            self.walls = prevState.walls
+            self.enemies = prevState.enemies
+
+            self.agentStates = list(prevState.agentStates)
             self.layout = prevState.layout
             self._killed = prevState._killed
             self.score = prevState.score
+            self.hashKey = prevState.hashKey
+            # kinds only change when agents are added or removed
+            self._agentIndexViews = prevState._agentIndexViews
+            self._occupancy = prevState._occupancy
+        else:
+            self._agentIndexViews = None
+            self._occupancy = None
             
+        self._writableAgents = set()
+        self._ownsOccupancy = False
+        self._journal = None # undo log of in-place moves, see GameState.applyMove
 
         self._asteroidEaten = None
         self._asteroidAdded = None
@@ -344,17 +621,188 @@ class GameStateData:
         state._asteroidAdded = self._asteroidAdded
 
         
+        state.agentStates = self.copyAgentStates(self.agentStates)
+        state._writableAgents = set(range(len(state.agentStates)))
         state.enemies = copy.deepcopy(self.enemies)
+        state._killed = list(self._killed)
         state.layout = copy.deepcopy(self.layout)
         state._agentMoved = self._agentMoved
         state._killedEnemy = self._killedEnemy
         return state
     
+    def freeze(self):
+        """
+        Turns this data into a read-only observation, in place and without copying it:
+        agents, grids and the data itself raise if they are changed afterwards. The
+        game never changes a state once its successor has been generated, so the
+        current state can be handed to the agents like this; successors generated
+        from it are ordinary writable data. The layout is shared with other states
+        and games, so it is swapped for its read-only view rather than frozen.
+        """
+        self.agentStates = tuple(self.agentStates)
+        for agentState in self.agentStates:
+            agentState.freeze()
+        self.asteroid.freeze()
+        self.walls.freeze()
+        self.layout = self.layout.getReadOnlyView()
+        self.enemies = tuple(self.enemies)
+        self._killed = tuple(self._killed)
+        self._agentDeleted = tuple(self._agentDeleted)
+        self._agentsAdded = tuple(self._agentsAdded)
+        self.__class__ = FrozenGameStateData
+
     def copyAgentStates(self, agentStates):
         copiedStates = []
         for agentState in agentStates:
             copiedStates.append(agentState.copy())
         return copiedStates
+
+    def getAgentStateForWrite(self, agentIndex):
+        """
+        Returns the AgentState at agentIndex, copying it first if it is still shared
+        with the predecessor data. Rules must use this before changing an agent.
+        """
+        if agentIndex not in self._writableAgents:
+            if self._journal != None:
+                self._journal.append((JOURNAL_SLOT, agentIndex, self.agentStates[agentIndex], self._writableAgents))
+            self.agentStates[agentIndex] = self.agentStates[agentIndex].copy()
+            self._writableAgents.add(agentIndex)
+        return self.agentStates[agentIndex]
+
+    # The hash key is the sum (mod 2**64) of the Zobrist keys of every asteroid
+    # and every agent. Summing instead of XOR-ing keeps two agents of the same
+    # kind on the same cell from cancelling out. All changes to agents and
+    # asteroid have to go through the methods below so that the key stays in sync.
+
+    def setAgentConfiguration(self, agentIndex, configuration):
+        agentState = self.getAgentStateForWrite(agentIndex)
+        self.hashKey = (self.hashKey - agentZobristKey(agentState)) & ZOBRIST_MASK
+        if self._occupancy != None:
+            self._moveOccupant(agentIndex, agentState.configuration.pos, configuration.pos)
+        if self._journal != None:
+            self._journal.append((JOURNAL_CONFIGURATION, agentState, agentState.configuration))
+        agentState.configuration = configuration
+        self.hashKey = (self.hashKey + agentZobristKey(agentState)) & ZOBRIST_MASK
+
+    def addAgentState(self, agentState):
+        self.agentStates.append(agentState)
+        self._agentIndexViews = None
+        if self._occupancy != None:
+            self._moveOccupant(len(self.agentStates) - 1, None, agentState.configuration.pos)
+        if self._journal != None:
+            self._journal.append((JOURNAL_ADD, self._writableAgents))
+        self._writableAgents.add(len(self.agentStates) - 1)
+        self.hashKey = (self.hashKey + agentZobristKey(agentState)) & ZOBRIST_MASK
+
+    def removeAgentState(self, agentIndex):
+        agentState = self.agentStates.pop(agentIndex)
+        if self._journal != None:
+            self._journal.append((JOURNAL_REMOVE, agentIndex, agentState))
+        self._agentIndexViews = None
+        self._occupancy = None # every later index shifts, rebuilt on demand
+        self.hashKey = (self.hashKey - agentZobristKey(agentState)) & ZOBRIST_MASK
+        self._writableAgents = set([i if i < agentIndex else i - 1 for i in self._writableAgents if i != agentIndex])
+
+    def removeAsteroid(self, position):
+        x, y = position
+        self.asteroid = self.asteroid.copy()
+        self.asteroid[x][y] = False
+        self.hashKey = (self.hashKey - zobristKey(ZOBRIST_ASTEROID, position)) & ZOBRIST_MASK
+
+    def markKilled(self, agentIndex):
+        # the flags are shared with the predecessor (and frozen in observations),
+        # so they are replaced rather than edited
+        if self._journal != None:
+            self._journal.append((JOURNAL_KILLED, self._killed))
+        killed = list(self._killed)
+        killed[agentIndex] = True
+        self._killed = killed
+
+    def getAgentIndices(self, *kinds):
+        """
+        Returns the sorted tuple of indices of the agents of the given kinds.
+
+        The per-kind views are built in one pass over the agents and are then
+        shared by every successor until an agent is added or removed.
+        """
+        if self._agentIndexViews == None:
+            views = dict([(kind, []) for kind in AgentKinds.ALL])
+            for index, agentState in enumerate(self.agentStates):
+                views[agentState.kind].append(index)
+            self._agentIndexViews = dict([((kind,), tuple(indices)) for kind, indices in views.items()])
+        indices = self._agentIndexViews.get(kinds)
+        if indices == None:
+            # the views dict is shared, but so are the kinds it describes
+            indices = tuple(sorted(sum([self._agentIndexViews[(kind,)] for kind in kinds], ())))
+            self._agentIndexViews[kinds] = indices
+        return indices
+
+    def getAgentsNear(self, pos):
+        """
+        Returns the sorted indices of the agents in the cell of pos or in one of
+        its eight neighbours, which covers every agent closer than a cell to pos.
+
+        Agents are looked up in a cell -> indices occupancy map that is shared
+        with the predecessor until an agent moves (copy-on-write) and kept up to
+        date by setAgentConfiguration and addAgentState.
+        """
+        if self._occupancy == None:
+            self._occupancy = {}
+            self._ownsOccupancy = True
+            for index, agentState in enumerate(self.agentStates):
+                cell = nearestPoint(agentState.configuration.pos)
+                self._occupancy[cell] = self._occupancy.get(cell, ()) + (index,)
+        x, y = nearestPoint(pos)
+        occupancy = self._occupancy
+        near = ()
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                near += occupancy.get((x + dx, y + dy), ())
+        return sorted(near)
+
+    def _moveOccupant(self, agentIndex, oldPos, newPos):
+        if not self._ownsOccupancy:
+            self._occupancy = self._occupancy.copy()
+            self._ownsOccupancy = True
+        if oldPos != None:
+            cell = nearestPoint(oldPos)
+            occupants = tuple([i for i in self._occupancy[cell] if i != agentIndex])
+            if occupants: self._occupancy[cell] = occupants
+            else: del self._occupancy[cell]
+        cell = nearestPoint(newPos)
+        self._occupancy[cell] = self._occupancy.get(cell, ()) + (agentIndex,)
+
+    def undoJournal(self, mark):
+        """
+        Reverts the changes journaled since the journal was mark entries long.
+        """
+        journal = self._journal
+        while len(journal) > mark:
+            entry = journal.pop()
+            kind = entry[0]
+            if kind == JOURNAL_CONFIGURATION:
+                entry[1].configuration = entry[2]
+            elif kind == JOURNAL_SLOT:
+                self.agentStates[entry[1]] = entry[2]
+                entry[3].discard(entry[1])
+            elif kind == JOURNAL_ADD:
+                self.agentStates.pop()
+                entry[1].discard(len(self.agentStates))
+            elif kind == JOURNAL_REMOVE:
+                self.agentStates.insert(entry[1], entry[2])
+            elif kind == JOURNAL_KILLED:
+                self._killed = entry[1]
+
+    def computeHashKey(self):
+        """
+        Computes the hash key from scratch (the rules keep it up to date incrementally).
+        """
+        key = 0
+        for pos in self.asteroid.asList():
+            key += zobristKey(ZOBRIST_ASTEROID, pos)
+        for agentState in self.agentStates:
+            key += agentZobristKey(agentState)
+        return key & ZOBRIST_MASK
     
     def __eq__( self, other ):
         """
@@ -362,21 +810,22 @@ class GameStateData:
         """
         if other == None: return False
         
-        if not self.agentStates == other.agentStates: return False
-        if not self.asteroid == other.asteroid: return False
+        if not self.hashKey == other.hashKey: return False
         if not self.score == other.score: return False
+        # equal keys almost always mean equal states, but make sure
+        if len(self.agentStates) != len(other.agentStates): return False
+        if not self.asteroid == other.asteroid: return False
+        for agentState, otherState in zip(self.agentStates, other.agentStates):
+            if agentState.kind != otherState.kind: return False
+            if agentState.configuration.pos != otherState.configuration.pos: return False
+            if agentState.start.pos != otherState.start.pos: return False
         return True
 
     def __hash__( self ):
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.asteroid) + 7 * hash(self.score)) % 1048575 )
+        return hash((self.hashKey, self.score))
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -437,6 +886,34 @@ class GameStateData:
             self.agentStates.append( AgentState( Configuration(pos), isSpaceShip, isUpBullet, isDownBullet))
         
         self._killed = [False for a in self.agentStates]
+        self.hashKey = self.computeHashKey()
+        self._agentIndexViews = None
+        self._occupancy = None
+
+
+class FrozenGameStateData(GameStateData):
+    """
+    A GameStateData that has been handed to the agents as an observation.
+    Only the lazily built lookup caches may still be filled in.
+    """
+    _CACHES = ('_agentIndexViews', '_occupancy', '_ownsOccupancy')
+
+    def __setattr__(self, name, value):
+        if name not in FrozenGameStateData._CACHES:
+            raise Exception("Observations are read-only: can't set %s of the game state" % name)
+        object.__setattr__(self, name, value)
+
+    def getAgentStateForWrite(self, agentIndex):
+        raise Exception("Observations are read-only: can't change agent %d" % agentIndex)
+
+    def addAgentState(self, agentState):
+        raise Exception("Observations are read-only: can't add an agent")
+
+    def removeAgentState(self, agentIndex):
+        raise Exception("Observations are read-only: can't remove agent %d" % agentIndex)
+
+    def freeze(self):
+        pass
 
 
 class Game:
@@ -444,7 +921,7 @@ class Game:
     The game manages the control flow, soliciting actions from the agents.
     """
 
-    def __init__(self, agents, display, rules, startingIndex = 0, muteAgents=False, catchExceptions=False, numEnemiesBullets=1):
+    def __init__(self, agents, display, rules, startingIndex = 0, muteAgents=False, catchExceptions=False, numEnemiesBullets=1, headless=False, bulletPhysics=False):
         self.agents = agents
         self.maxNumEnemiesBullets = numEnemiesBullets
         self.display = display
@@ -457,6 +934,11 @@ class Game:
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
+        # a headless game never polls pygame events nor waits for the frame clock
+        self.headless = headless
+        # bullets advance together in one physics step per round instead of taking agent turns
+        self.bulletPhysics = bulletPhysics
+        self.elapsedTime = 0
         import io
         self.agentOutput = [io.StringIO() for agent in agents]
 
@@ -467,15 +949,17 @@ class Game:
         Main control loop for game play.
         """
 
+        if not self.headless: initPygame()
         self.display.initialize(self.state.data)
         self.numMoves = 0
+        startTime = time.time()
 
         # inform learning agents of the game start
         for i in range(len(self.agents)):
             agent = self.agents[i]
 
             if ("registerInitialState" in dir(agent)):
-                agent.registerInitialState(self.state.deepCopy())
+                agent.registerInitialState(self.state.getObservation())
 
         agentIndex = self.startingIndex
         numAgents = len( self.agents )
@@ -483,28 +967,36 @@ class Game:
         while not self.gameOver:
 
             # when to exit game volunteerily
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    print("Space Invader exited! Score: %d" % self.state.data.score)
-                    self.gameOver = True
+            if not self.headless:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        print("Space Invader exited! Score: %d" % self.state.data.score)
+                        self.gameOver = True
             
+            if self.bulletPhysics and agentIndex == self.state.getNumMinMaxAgents():
+                self.state = self.state.generateBulletsSuccessor(self.bulletMoved)
+                agentIndex = 0
+                if not self.headless: clock.tick(60)
+                continue
+
             # Fetch the next agent
             agent = self.agents[agentIndex]
             # Generate an observation of the state
-            observation = self.state.deepCopy() 
+            observation = self.state.getObservation()
 
             # Solicit an action
-            action = agent.getAction(observation, agentIndex) 
+            action = searchHooks.getAgentAction(agent, observation, agentIndex)
 
             # Execute the action
             self.moveHistory.append((agentIndex, action))
+            self.numMoves += 1
             newState = self.state.generateSuccessor( agentIndex, action ) 
 
             for agent in newState.data._agentsAdded: 
                 self.agents.append(agent)
             for idx in sorted(newState.data._agentDeleted, reverse=True): 
                 del self.agents[idx]
-                del newState.data.agentStates[idx]
+                newState.data.removeAgentState(idx)
             
             agentIndex = newState.data._agentMoved #this _agentMoved specifies the last moved agent among the current agents
             # since some of the agents might have been removed while generating successors
@@ -525,6 +1017,20 @@ class Game:
             # Next agent
             agentIndex = ( agentIndex + 1) % numAgents
 
-            clock.tick(60)
+            if not self.headless: clock.tick(60)
+
+        self.elapsedTime = time.time() - startTime
+
+    def bulletMoved(self, state, bulletIndex, action):
+        """
+        Bookkeeping for one bullet move of a physics step, mirroring what run()
+        does after an agent turn.
+        """
+        self.moveHistory.append((bulletIndex, action))
+        self.numMoves += 1
+        for idx in sorted(state.data._agentDeleted, reverse=True):
+            del self.agents[idx]
+        self.display.update( state.data )
+        self.rules.process(state, self)
 
         
\ No newline at end of file
@@ -1,7 +1,6 @@
 """
 keyboardAgents.py
 """
-import pygame
 import random
 import sys
 from game import Agent
@@ -18,6 +17,7 @@ class KeyboardAgent(Agent):
         self.keys = []
 
     def getAction(self, state, agentStateIndex):
+        import pygame # imported here so that loading the agent modules never pulls in pygame
 
         keys = pygame.key.get_pressed()
         if keys!=[]:
@@ -33,6 +33,7 @@ class KeyboardAgent(Agent):
         return move
 
     def getMove(self):
+        import pygame
         move = Directions.STOP
         if (self.keys[pygame.K_LEFT]): move = Directions.LEFT
         if (self.keys[pygame.K_RIGHT]): move = Directions.RIGHT
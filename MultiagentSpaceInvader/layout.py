@@ -3,8 +3,7 @@ For different layouts of the game
 """
 import copy
 from util import *
-from game import Grid
-import pygame
+from game import BitGrid, Actions, AgentKinds, Directions
 from queue import Queue
 import math
 
@@ -17,14 +16,16 @@ class Layout:
     def __init__(self, layoutText):
         self.width = len(layoutText[0])
         self.height = len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
+        self.walls = BitGrid(self.width, self.height, False)
         self.agentPositions = []
         self.numEnemies = 0
-        self.asteroid = Grid(self.width, self.height, False)
+        self.asteroid = BitGrid(self.width, self.height, False)
         self.processLayoutText(layoutText)
         self.enemies = []
         self.layoutText = layoutText
         self.totalAsteroid = len(self.asteroid.asList())
+        self.legalActions = self.buildLegalActionTable()
+        self._readOnlyView = None
 
     def getNumEnemies(self):
         return self.numEnemies  
@@ -43,6 +44,45 @@ class Layout:
         dist, pos = max([(manhattanDistance(p, spPos), p) for p in poses])
         return pos
     
+    # bullets can always move on: running into a wall is what removes them
+    BULLET_ACTIONS = {AgentKinds.UP_BULLET: (Directions.UP,), AgentKinds.DOWN_BULLET: (Directions.DOWN,)}
+
+    def buildLegalActionTable(self):
+        """
+        Walls never change, so the legal actions of the spaceship and of enemies in
+        every cell are computed once, as legalActions[agentKind][x][y].
+        """
+        table = {}
+        for agentKind in (AgentKinds.SHIP, AgentKinds.ENEMY):
+            table[agentKind] = [[Actions.getPossibleActionsAt(agentKind, x, y, self.walls)
+                                 for y in range(self.height)] for x in range(self.width)]
+        return table
+
+    def getLegalActions(self, agentKind, pos):
+        """
+        Returns the tuple of legal actions of an agent of agentKind at pos.
+        """
+        if agentKind in Layout.BULLET_ACTIONS:
+            return Layout.BULLET_ACTIONS[agentKind]
+        x, y = pos
+        return self.legalActions[agentKind][int(x + 0.5)][int(y + 0.5)]
+
+    def getReadOnlyView(self):
+        """
+        Returns a copy of this layout with frozen copies of its walls and asteroid
+        grids, for observations (see GameStateData.freeze). It is built once and
+        shares everything else with this layout, which stays writable.
+        """
+        if self._readOnlyView == None:
+            view = copy.copy(self)
+            view.walls = self.walls.copy()
+            view.walls.freeze()
+            view.asteroid = self.asteroid.copy()
+            view.asteroid.freeze()
+            view._readOnlyView = view
+            self._readOnlyView = view
+        return self._readOnlyView
+
     def getEnemies(self):
         self.enemies = [(i, pos) for i, j, k, pos in self.agentPositions if i==0 and j==0 and k==0]
         return self.enemies
@@ -0,0 +1,321 @@
+"""
+mctsAgents.py
+
+A Monte Carlo tree search spaceship agent. Instead of searching every bullet
+as a ply, it samples whole rounds of play (spaceship move, random enemy moves,
+bullets) on RolloutSimulator, a stripped-down copy of the game rules that
+works on a few small lists rather than on GameStates.
+"""
+
+import math
+import random
+import time
+
+from game import Directions, AgentKinds
+from searchSupport import SearchAgentBase
+from spaceship import TIME_PENALTY
+import searchHooks
+
+LEFT, RIGHT, FIRE, STOP, UP, DOWN = Directions.LEFT, Directions.RIGHT, Directions.FIRE, Directions.STOP, Directions.UP, Directions.DOWN
+
+# simulator state fields
+SHIP, ENEMIES, BULLETS, ASTEROID, SCORE, RESULT = range(6)
+
+
+class RolloutSimulator:
+    """
+    Plays rounds of the game on a compact state:
+    [spaceship cell, [enemy cell, ...], [bullet, ...], asteroid bits, score, result]
+    where a cell is the bit index x * height + y of a position (as in BitGrid),
+    a bullet is its cell << 1, plus 1 when it flies down, and result is 1 for a
+    win, -1 for a loss and 0 while the game goes on. Moving a bullet one row is
+    then adding or subtracting 2, and finding what is on a cell a list
+    membership test.
+
+    A round is the spaceship's move, one random move per enemy (as RandomAgent
+    plays) and then every bullet in the order it was fired, with the scoring
+    of the real rules. Agents only collide on the same cell, as BulletRules.canHit
+    does for whole-cell positions. The simulator does not reproduce the real
+    game's turn order quirks, so it is meant for rollouts, not for replaying
+    games.
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.walls = layout.walls.bits
+        self.height = layout.height
+        self.shipActions = None
+        self.enemyMoves = [None] * (layout.width * layout.height)
+
+    def fromGameState(self, gameState):
+        data = gameState.data
+        height = self.height
+        agentStates = data.agentStates
+        shipX, shipY = agentStates[0].configuration.pos
+        ship = int(shipX) * height + int(shipY)
+        if self.shipActions == None:
+            shipActions = self.layout.legalActions[AgentKinds.SHIP]
+            self.shipActions = [shipActions[cell // height][cell % height] for cell in range(len(self.enemyMoves))]
+        enemies = []
+        self.enemyStarts = []
+        bullets = []
+        for agentState in agentStates:
+            x, y = agentState.configuration.pos
+            cell = int(x) * height + int(y)
+            if agentState.kind == AgentKinds.ENEMY:
+                enemies.append(cell)
+                startX, startY = agentState.start.pos
+                self.enemyStarts.append(int(startX) * height + int(startY))
+            elif agentState.kind == AgentKinds.UP_BULLET:
+                bullets.append(cell << 1)
+            elif agentState.kind == AgentKinds.DOWN_BULLET:
+                bullets.append(cell << 1 | 1)
+        result = 1 if gameState.isWin() else -1 if gameState.isLose() else 0
+        return [ship, enemies, bullets, data.asteroid.bits, data.score, result]
+
+    def copy(self, state):
+        return [state[SHIP], state[ENEMIES][:], state[BULLETS][:], state[ASTEROID], state[SCORE], state[RESULT]]
+
+    def getShipActions(self, state):
+        return self.shipActions[state[SHIP]]
+
+    def getEnemyMoves(self, cell):
+        """
+        The cumulative RandomAgent weights of the legal actions of an enemy on
+        cell (FIRE at half the weight of the others), and the cell each action
+        leads to, or -1 for FIRE.
+        """
+        moves = self.enemyMoves[cell]
+        if moves == None:
+            height = self.height
+            weights, targets = [], []
+            total = 0.0
+            for action in self.layout.legalActions[AgentKinds.ENEMY][cell // height][cell % height]:
+                total += 0.5 if action == FIRE else 1.0
+                weights.append(total)
+                if action == FIRE: targets.append(-1)
+                elif action == LEFT: targets.append(cell - height)
+                elif action == RIGHT: targets.append(cell + height)
+                elif action == UP: targets.append(cell - 1)
+                elif action == DOWN: targets.append(cell + 1)
+                else: targets.append(cell)
+            moves = self.enemyMoves[cell] = ([w / total for w in weights], targets)
+        return moves
+
+    def step(self, state, shipAction):
+        """
+        Plays one round in place, starting with shipAction.
+        """
+        enemies = state[ENEMIES]
+        bullets = state[BULLETS]
+
+        # spaceship
+        ship = state[SHIP]
+        if shipAction == LEFT: ship -= self.height
+        elif shipAction == RIGHT: ship += self.height
+        elif shipAction == FIRE: bullets.append((ship - 1) << 1)
+        state[SHIP] = ship
+        state[SCORE] -= TIME_PENALTY
+        if ship << 1 | 1 in bullets:
+            state[SCORE] -= 500
+            state[RESULT] = -1
+            return
+
+        # enemies
+        rand = random.random
+        enemyMoves = self.enemyMoves
+        for index in range(len(enemies)):
+            cell = enemies[index]
+            moves = enemyMoves[cell] or self.getEnemyMoves(cell)
+            weights = moves[0]
+            r = rand()
+            i = 0
+            while weights[i] < r: i += 1
+            cell = moves[1][i]
+            if cell < 0:
+                bullets.append((enemies[index] + 1) << 1 | 1)
+                continue
+            enemies[index] = cell
+            if cell << 1 in bullets:
+                enemies[index] = self.enemyStarts[index]
+                state[SCORE] += 100
+                bullets.remove(cell << 1)
+
+        # bullets, each seeing the others where they are at that moment
+        if not bullets: return
+        walls = self.walls
+        destroyed = None
+        for b in range(len(bullets)):
+            bullet = bullets[b]
+            if destroyed and b in destroyed: continue
+            if bullet & 1:
+                # coming down: it hits the spaceship or an up bullet
+                bullet += 2
+                bullets[b] = bullet
+                cell = bullet >> 1
+                if (walls >> cell) & 1:
+                    if destroyed == None: destroyed = set()
+                    destroyed.add(b)
+                elif cell == ship:
+                    state[SCORE] -= 500
+                    state[RESULT] = -1
+                    return
+                elif bullet - 1 in bullets:
+                    other = self.findBullet(bullets, bullet - 1, destroyed)
+                    if other >= 0:
+                        if destroyed == None: destroyed = set()
+                        destroyed.add(other)
+                        destroyed.add(b)
+                continue
+            bullet -= 2
+            bullets[b] = bullet
+            cell = bullet >> 1
+            if (walls >> cell) & 1:
+                if destroyed == None: destroyed = set()
+                destroyed.add(b)
+                continue
+            bit = 1 << cell
+            if state[ASTEROID] & bit:
+                if destroyed == None: destroyed = set()
+                destroyed.add(b)
+                state[ASTEROID] &= ~bit
+                state[SCORE] += 100
+                if state[ASTEROID] == 0:
+                    state[SCORE] += 500
+                    state[RESULT] = 1
+                    return
+                continue
+            other = self.findBullet(bullets, bullet + 1, destroyed) if bullet + 1 in bullets else -1
+            if other >= 0:
+                if destroyed == None: destroyed = set()
+                destroyed.add(other)
+                destroyed.add(b)
+            elif cell in enemies:
+                index = enemies.index(cell)
+                enemies[index] = self.enemyStarts[index]
+                state[SCORE] += 100
+                if destroyed == None: destroyed = set()
+                destroyed.add(b)
+        if destroyed:
+            state[BULLETS] = [bullets[b] for b in range(len(bullets)) if b not in destroyed]
+
+    def findBullet(self, bullets, bullet, destroyed):
+        "The index of the first bullet equal to bullet that is not destroyed, or -1."
+        for other in range(len(bullets)):
+            if bullets[other] == bullet and not (destroyed and other in destroyed):
+                return other
+        return -1
+
+    def rollout(self, state, rounds):
+        """
+        Plays up to rounds random rounds in place and returns the final score.
+        """
+        rand = random.random
+        shipActions = self.shipActions
+        for i in range(rounds):
+            if state[RESULT] != 0: break
+            actions = shipActions[state[SHIP]]
+            self.step(state, actions[int(rand() * len(actions))])
+        return state[SCORE]
+
+
+class MCTSNode:
+    """
+    A node of the open-loop search tree: the statistics of one sequence of
+    spaceship actions, whatever the enemies did in between.
+    """
+    __slots__ = ('children', 'visits', 'total')
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.total = 0.0
+
+
+class MCTSAgent(SearchAgentBase):
+    """
+    Monte Carlo tree search with UCT selection.
+
+    Options (-a): timeMs and/or iterations bound the search of each move
+    (iterations=1000 when neither is given), rolloutDepth is the number of
+    rounds a rollout plays and exploration the UCT constant, in score points.
+    The subtree of the chosen action is kept for the next move.
+    """
+
+    def __init__(self, timeMs='0', iterations='0', rolloutDepth='5', exploration='100', stats=''):
+        self.index = 0 # SpaceShip is always agent index 0
+        SearchAgentBase.__init__(self, timeMs=timeMs, stats=stats)
+        self.iterations = int(iterations)
+        if self.iterations <= 0 and self.timeBudget <= 0: self.iterations = 1000
+        self.rolloutDepth = int(rolloutDepth)
+        self.exploration = float(exploration)
+        self.simulator = None
+        self.root = None
+
+    def registerInitialState(self, gameState):
+        self.simulator = RolloutSimulator(gameState.data.layout)
+        self.root = None
+
+    def getAction(self, gameState, agentIndex=0):
+        if self.simulator == None or self.simulator.layout is not gameState.data.layout:
+            self.registerInitialState(gameState)
+        simulator = self.simulator
+        rootState = simulator.fromGameState(gameState)
+        rootActions = simulator.getShipActions(rootState)
+        if self.root == None: self.root = MCTSNode()
+
+        startTime = time.time()
+        deadline = startTime + self.timeBudget if self.timeBudget > 0 else None
+        rollouts = 0
+        while True:
+            if self.iterations > 0 and rollouts >= self.iterations: break
+            if deadline != None and rollouts % 16 == 0 and time.time() > deadline: break
+            self.iterate(simulator.copy(rootState))
+            rollouts += 1
+
+        action = max(rootActions, key=lambda a: self.root.children[a].visits if a in self.root.children else -1)
+        seconds = time.time() - startTime
+        hook = searchHooks.activeHook
+        if hook != None:
+            hook.note('rollouts', rollouts)
+            hook.note('rolloutsPerSec', rollouts / seconds if seconds > 0 else 0.0)
+        self.root = self.root.children.get(action)
+        return action
+
+    def iterate(self, state):
+        """
+        One selection, expansion, rollout and backup from the root.
+        """
+        simulator = self.simulator
+        startScore = state[SCORE]
+        path = [self.root]
+        node = self.root
+        while state[RESULT] == 0:
+            actions = simulator.getShipActions(state)
+            if len(node.children) < len(actions):
+                action = random.choice([a for a in actions if a not in node.children])
+                child = MCTSNode()
+                node.children[action] = child
+                simulator.step(state, action)
+                path.append(child)
+                break
+            action = self.select(node, actions)
+            node = node.children[action]
+            simulator.step(state, action)
+            path.append(node)
+
+        value = simulator.rollout(state, self.rolloutDepth) - startScore
+        for node in path:
+            node.visits += 1
+            node.total += value
+
+    def select(self, node, actions):
+        logVisits = math.log(node.visits)
+        exploration = self.exploration
+        best, bestAction = None, None
+        for action in actions:
+            child = node.children[action]
+            value = child.total / child.visits + exploration * math.sqrt(logVisits / child.visits)
+            if best == None or value > best:
+                best, bestAction = value, action
+        return bestAction
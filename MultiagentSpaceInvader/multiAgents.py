@@ -5,6 +5,7 @@ from game import Game
 import copy
 from util import manhattanDistance, semiManhattanDistance
 import util
+from searchSupport import SearchAgentBase
 
 class ReflexAgent(Agent):
     """
@@ -73,7 +74,7 @@ def scoreEvaluationFunction(currentGameState: GameState):
     """
     return currentGameState.getScore()
 
-class MultiAgentSearchAgent(Agent):
+class MultiAgentSearchAgent(SearchAgentBase):
     """
     This class provides some common elements to all of your
     multi-agent searchers. Any methods defined here will be available
@@ -88,10 +89,12 @@ class MultiAgentSearchAgent(Agent):
     is another abstract class.
     """
 
-    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2'):
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', **searchOptions):
         self.index = 0 # SpaceShip is always agent index 0
         self.evaluationFunction = util.lookup(evalFn, globals())
         self.depth = int(depth)
+        # the stats, ttSize, timeMs and evalCache options (see searchSupport.py)
+        SearchAgentBase.__init__(self, **searchOptions)
 
 class MinimaxAgent(MultiAgentSearchAgent):
     """
@@ -6,10 +6,12 @@ import testClasses
 import spaceship
 import layout
 import random
+import util
 from enemyAgents import RandomAgent, DirectionalAgent
 from collections import defaultdict
 import json
-from game import Agent
+import textDisplay
+from game import Agent, Grid
 from spaceship import GameState
 
 class EvalAgentTest(testClasses.TestCase):
@@ -53,7 +55,8 @@ class EvalAgentTest(testClasses.TestCase):
         disp = self.question.getDisplay()
 
         random.seed(self.seed)
-        games = spaceship.run_games(agent, self.numGames, self.enemies, lay, disp)
+        headless = 'checkNullDisplay' in dir(disp) and disp.checkNullDisplay()
+        games = spaceship.run_games(agent, self.numGames, self.enemies, lay, disp, headless=headless)
         
         totalTime = time.time() - startTime
 
@@ -362,3 +365,658 @@ class GradingAgent(Agent):
         else:
             return len(self.suboptimalMoves)
         
+
+
+class BitGridTest(testClasses.TestCase):
+    """
+    Checks game.BitGrid against the list-of-lists game.Grid it replaces: the
+    walls and asteroid of a layout, numOperations random writes (from
+    randomSeed) to a copy of the asteroid, and the read-only layout view.
+    """
+
+    def __init__(self, question, testDict):
+        super(BitGridTest, self).__init__(question, testDict)
+        self.layoutName = testDict['layoutName']
+        self.numOperations = int(testDict.get('numOperations', '0'))
+        self.seed = int(testDict.get('randomSeed', '0'))
+
+    def compare(self, bitGrid, grid, name):
+        "Returns the first difference between bitGrid and grid, or None."
+        for x in range(grid.width):
+            for y in range(grid.height):
+                if bitGrid[x][y] != grid[x][y]:
+                    return '%s: cell %s is %s instead of %s' % (name, (x, y), bitGrid[x][y], grid[x][y])
+        if bitGrid != grid:
+            return '%s: the grids hold the same cells but are not equal' % name
+        if bitGrid.count() != grid.count() or bitGrid.count(False) != grid.count(False):
+            return '%s: count() is %d instead of %d' % (name, bitGrid.count(), grid.count())
+        if sorted(bitGrid.asList()) != sorted(grid.asList()):
+            return '%s: asList() differs' % name
+        if bitGrid.packBits() != grid.packBits() or hash(bitGrid) != hash(grid):
+            return '%s: packBits() or hash() differs' % name
+        return None
+
+    def run(self):
+        "Returns (the number of walls, the number of asteroids, an error message or None)."
+        lay = layout.getLayout(self.layoutName)
+        walls = Grid(lay.width, lay.height)
+        asteroid = Grid(lay.width, lay.height)
+        for y, line in enumerate(lay.layoutText):
+            for x, layoutChar in enumerate(line):
+                if layoutChar == '%': walls[x][y] = True
+                elif layoutChar == 'F': asteroid[x][y] = True
+        counts = (walls.count(), asteroid.count())
+        error = self.compare(lay.walls, walls, 'walls') or self.compare(lay.asteroid, asteroid, 'asteroid')
+        if error != None: return counts + (error,)
+
+        rng = random.Random(self.seed)
+        bitGrid = lay.asteroid.copy()
+        grid = asteroid.copy()
+        for i in range(self.numOperations):
+            # negative indices count from the end, as for lists
+            x, y = rng.randrange(-lay.width, lay.width), rng.randrange(-lay.height, lay.height)
+            value = rng.random() < 0.5
+            bitGrid[x][y] = value
+            grid[x][y] = value
+        error = self.compare(bitGrid, grid, 'after %d random writes' % self.numOperations)
+        if error == None and lay.asteroid != asteroid:
+            error = 'writing to a copy of the asteroid changed the layout'
+        if error != None: return counts + (error,)
+
+        view = lay.getReadOnlyView()
+        try:
+            view.walls[0][0] = not view.walls[0][0]
+            error = 'the walls of the read-only layout view could be changed'
+        except Exception:
+            if lay.walls != walls: error = 'writing to the read-only view changed the layout'
+        return counts + (error,)
+
+    def execute(self, grades, moduleDict, solutionDict):
+        numWalls, numAsteroids, error = self.run()
+        if error == None and (numWalls, numAsteroids) != (int(solutionDict['walls']), int(solutionDict['asteroids'])):
+            error = '%d walls and %d asteroids instead of %s and %s' % (numWalls, numAsteroids, solutionDict['walls'], solutionDict['asteroids'])
+        if error != None:
+            self.addMessage(error)
+            return self.testFail(grades)
+        self.addMessage('%d walls and %d asteroids on %s' % (numWalls, numAsteroids, self.layoutName))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        numWalls, numAsteroids, error = self.run()
+        if error != None: raise Exception('Error in game.BitGrid: %s' % error)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('walls: "%d"\n' % numWalls)
+        handle.write('asteroids: "%d"\n' % numAsteroids)
+        handle.close()
+        return True
+
+
+class RandomSpaceShipAgent(Agent):
+    "Plays a random legal action, for tests that need whole games."
+
+    def getAction(self, state, agentIndex=0):
+        return random.choice(state.getLegalActions(agentIndex))
+
+
+class WatchingDisplay(textDisplay.NullGraphics):
+    "A NullGraphics that hands the GameStateData of every move to onUpdate."
+
+    def __init__(self, onUpdate):
+        self.onUpdate = onUpdate
+
+    def update(self, state):
+        self.onUpdate(state)
+
+
+def playRandomGames(layoutName, numGames, seed, display=None, bulletPhysics=False):
+    """
+    Plays numGames headless games of RandomSpaceShipAgent against RandomAgent
+    enemies, game i seeded with spaceship.gameSeed(seed, i), and returns them.
+    """
+    lay = layout.getLayout(layoutName)
+    enemies = [RandomAgent(i + 1) for i in range(lay.getNumEnemies())]
+    if display == None: display = textDisplay.NullGraphics()
+    rules = spaceship.ClassicGameRules()
+    games = []
+    for i in range(numGames):
+        random.seed(spaceship.gameSeed(seed, i))
+        game = rules.newGame(lay, RandomSpaceShipAgent(), enemies, display, quiet=True, headless=True, bulletPhysics=bulletPhysics)
+        game.run()
+        games.append(game)
+    return games
+
+
+class ZobristKeyTest(testClasses.TestCase):
+    """
+    Plays seeded random games and checks the incrementally kept hash key of
+    every state against GameStateData.computeHashKey. States with the same key
+    must hold the same agents and asteroid.
+    """
+
+    def __init__(self, question, testDict):
+        super(ZobristKeyTest, self).__init__(question, testDict)
+        self.layoutName = testDict['layoutName']
+        self.numGames = int(testDict['numGames'])
+        self.seed = testDict['randomSeed']
+        self.bulletPhysics = testDict.get('bulletPhysics', 'False') == 'True'
+
+    def run(self):
+        "Returns (the number of states, the number of distinct keys, an error message or None)."
+        contents = {} # hash key -> (agents, asteroid bits) of the first state seen with it
+        errors = []
+        def checkState(data):
+            if errors: return
+            if data.hashKey != data.computeHashKey():
+                errors.append('state %d: hash key %d, computed from scratch %d\n%s' % (numStates[0], data.hashKey, data.computeHashKey(), data))
+            content = (tuple(sorted([(agentState.kind, agentState.configuration.pos, agentState.start.pos) for agentState in data.agentStates])),
+                       data.asteroid.bits)
+            if contents.setdefault(data.hashKey, content) != content:
+                errors.append('state %d: two different states share the hash key %d' % (numStates[0], data.hashKey))
+            numStates[0] += 1
+        numStates = [0]
+        playRandomGames(self.layoutName, self.numGames, self.seed, WatchingDisplay(checkState), self.bulletPhysics)
+        return numStates[0], len(contents), errors[0] if errors else None
+
+    def execute(self, grades, moduleDict, solutionDict):
+        numStates, numKeys, error = self.run()
+        if error == None and (numStates, numKeys) != (int(solutionDict['states']), int(solutionDict['distinctKeys'])):
+            error = '%d states with %d distinct keys instead of %s and %s' % (numStates, numKeys, solutionDict['states'], solutionDict['distinctKeys'])
+        if error != None:
+            self.addMessage(error)
+            return self.testFail(grades)
+        self.addMessage('%d states with %d distinct keys in %d games on %s' % (numStates, numKeys, self.numGames, self.layoutName))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        numStates, numKeys, error = self.run()
+        if error != None: raise Exception('Error in the hash keys: %s' % error)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('states: "%d"\n' % numStates)
+        handle.write('distinctKeys: "%d"\n' % numKeys)
+        handle.close()
+        return True
+
+
+class OccupancyCheckTest(testClasses.TestCase):
+    """
+    Plays seeded random games with BulletRules.VERIFY_OCCUPANCY on, so that
+    every collision lookup in the occupancy map is checked against a scan of all
+    agents (the check raises on a difference). The scores must match the solution.
+    """
+
+    def __init__(self, question, testDict):
+        super(OccupancyCheckTest, self).__init__(question, testDict)
+        self.layoutName = testDict['layoutName']
+        self.numGames = int(testDict['numGames'])
+        self.seed = testDict['randomSeed']
+        self.bulletPhysics = testDict.get('bulletPhysics', 'False') == 'True'
+
+    def run(self):
+        "Returns the scores of the games, or raises if a lookup was wrong."
+        verify = spaceship.BulletRules.VERIFY_OCCUPANCY
+        spaceship.BulletRules.VERIFY_OCCUPANCY = True
+        try:
+            games = playRandomGames(self.layoutName, self.numGames, self.seed, bulletPhysics=self.bulletPhysics)
+        finally:
+            spaceship.BulletRules.VERIFY_OCCUPANCY = verify
+        return [game.state.getScore() for game in games]
+
+    def execute(self, grades, moduleDict, solutionDict):
+        try:
+            scores = self.run()
+        except Exception as e:
+            self.addMessage(str(e))
+            return self.testFail(grades)
+        gold = [float(score) for score in solutionDict['scores'].split()]
+        if scores != gold:
+            self.addMessage('scores:\t\t%s' % ' '.join(['%g' % score for score in scores]))
+            self.addMessage('correct scores:\t%s' % ' '.join(['%g' % score for score in gold]))
+            return self.testFail(grades)
+        self.addMessage('scores:\t%s' % ' '.join(['%g' % score for score in scores]))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        scores = self.run()
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('scores: "%s"\n' % ' '.join(['%g' % score for score in scores]))
+        handle.close()
+        return True
+
+
+class TranspositionTableTest(testClasses.TestCase):
+    """
+    Runs a util.TranspositionTable of size buckets through the operations of
+    the test, one per line: "store key depth value bound [action]",
+    "lookup key depth [alpha beta]" or "best key". The answers of the lookups
+    and best action queries must match the solution. With layoutName, the keys
+    of TranspositionTable.makeKey for the start state are checked as well.
+    """
+
+    def __init__(self, question, testDict):
+        super(TranspositionTableTest, self).__init__(question, testDict)
+        self.size = int(testDict['size'])
+        self.operations = testDict['operations']
+        self.layoutName = testDict.get('layoutName', None)
+
+    def checkKeys(self):
+        "Returns a message if makeKey mixes up states, turns or plies, or None."
+        from util import TranspositionTable
+        lay = layout.getLayout(self.layoutName)
+        state = GameState()
+        state.initialize(lay, lay.getNumEnemies())
+        keys = [TranspositionTable.makeKey(state, agentIndex, ply) for agentIndex in range(2) for ply in range(2)]
+        if len(set(keys)) != len(keys):
+            return 'makeKey gives the same key to different agents or plies: %s' % keys
+        if TranspositionTable.makeKey(state.deepCopy(), 0, 0) != keys[0]:
+            return 'makeKey gives a copy of the state another key'
+        successor = state.generateSuccessor(0, state.getLegalActions(0)[0])
+        if TranspositionTable.makeKey(successor, 0, 0) == keys[0]:
+            return 'makeKey gives the successor of a state the same key'
+        return None
+
+    def run(self):
+        "Returns the answers of the lookup and best operations."
+        from util import TranspositionTable
+        table = TranspositionTable(self.size)
+        answers = []
+        for line in self.operations.split('\n'):
+            tokens = line.split()
+            if not tokens: continue
+            if tokens[0] == 'store':
+                action = tokens[5] if len(tokens) > 5 else None
+                table.store(tokens[1], int(tokens[2]), float(tokens[3]), getattr(TranspositionTable, tokens[4]), action)
+            elif tokens[0] == 'lookup':
+                window = [float(bound) for bound in tokens[3:5]]
+                answers.append(str(table.lookup(tokens[1], int(tokens[2]), *window)))
+            elif tokens[0] == 'best':
+                answers.append(str(table.getBestAction(tokens[1])))
+            else:
+                raise Exception('TranspositionTableTest: unknown operation ' + line)
+        return answers
+
+    def execute(self, grades, moduleDict, solutionDict):
+        error = self.checkKeys() if self.layoutName != None else None
+        if error != None:
+            self.addMessage(error)
+            return self.testFail(grades)
+        answers = self.run()
+        gold = solutionDict['answers'].split()
+        if answers != gold:
+            self.addMessage('answers:\t\t%s' % ' '.join(answers))
+            self.addMessage('correct answers:\t%s' % ' '.join(gold))
+            return self.testFail(grades)
+        self.addMessage('answers:\t%s' % ' '.join(answers))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('answers: "%s"\n' % ' '.join(self.run()))
+        handle.close()
+        return True
+
+
+class IterativeDeepeningTest(testClasses.TestCase):
+    """
+    Drives searchSupport.SearchAgentBase.iterativeDeepening with a stand-in
+    search that finishes every depth below timeoutDepth at once and spins on
+    checkTime at timeoutDepth, under a budget of timeMs (0 for none). The depths
+    searched and the action returned must match the solution, as must the order
+    orderActions gives after the cutoffs listed in cutoffs ("agent action ply depth").
+    """
+
+    def __init__(self, question, testDict):
+        super(IterativeDeepeningTest, self).__init__(question, testDict)
+        self.timeMs = testDict['timeMs']
+        self.depth = int(testDict['depth'])
+        self.timeoutDepth = int(testDict['timeoutDepth'])
+        self.cutoffs = testDict.get('cutoffs', '')
+
+    def run(self):
+        "Returns (the depths searched, the action chosen, the action orders)."
+        from searchSupport import SearchAgentBase
+        agent = SearchAgentBase(timeMs=self.timeMs)
+        agent.depth = self.depth
+        searched = []
+        def searchRoot(gameState, depth):
+            searched.append(depth)
+            while depth >= self.timeoutDepth:
+                agent.checkTime()
+                time.sleep(0.001)
+            return 'depth%d' % depth
+        action = agent.iterativeDeepening(None, searchRoot)
+
+        for line in self.cutoffs.split('\n'):
+            tokens = line.split()
+            if tokens: agent.recordCutoff(int(tokens[0]), tokens[1], int(tokens[2]), int(tokens[3]))
+        agent.rootAction = 'Stop'
+        actions = ['Left', 'Right', 'Fire', 'Stop']
+        orders = [agent.orderActions(None, 0, actions, ply) for ply in range(3)]
+        return searched, action, [','.join(order) for order in orders]
+
+    def execute(self, grades, moduleDict, solutionDict):
+        searched, action, orders = self.run()
+        result = (' '.join([str(depth) for depth in searched]), action, ' '.join(orders))
+        gold = (solutionDict['searched'], solutionDict['action'], solutionDict['orders'])
+        if result != gold:
+            self.addMessage('depths searched %s, action %s, action orders %s' % result)
+            self.addMessage('correct: depths searched %s, action %s, action orders %s' % gold)
+            return self.testFail(grades)
+        self.addMessage('depths searched %s, action %s' % result[:2])
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        searched, action, orders = self.run()
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('searched: "%s"\n' % ' '.join([str(depth) for depth in searched]))
+        handle.write('action: "%s"\n' % action)
+        handle.write('orders: "%s"\n' % ' '.join(orders))
+        handle.close()
+        return True
+
+
+class UndoMoveTest(testClasses.TestCase):
+    """
+    Plays a seeded random game and, from each of its first numStates states,
+    walks a random tree of moves depth deep with applyMove/undoMove on a working
+    copy. After every applyMove the copy must look like the state
+    generateSuccessor gives, and after every undoMove like it did before.
+    """
+
+    def __init__(self, question, testDict):
+        super(UndoMoveTest, self).__init__(question, testDict)
+        self.layoutName = testDict['layoutName']
+        self.seed = int(testDict['randomSeed'])
+        self.numStates = int(testDict['numStates'])
+        self.depth = int(testDict['depth'])
+
+    def snapshot(self, gameState):
+        data = gameState.data
+        agents = tuple([(agentState.kind, agentState.configuration.pos) for agentState in data.agentStates])
+        return (agents, tuple(sorted(set(data._agentDeleted))), data.asteroid.bits, data.score, data.hashKey, data._win, data._lose)
+
+    def run(self):
+        "Returns (the number of moves made and undone, an error message or None)."
+        random.seed(self.seed)
+        lay = layout.getLayout(self.layoutName)
+        gameState = GameState()
+        gameState.initialize(lay, lay.getNumEnemies())
+        agents = [RandomSpaceShipAgent()] + [RandomAgent(i + 1) for i in range(lay.getNumEnemies())]
+        moves = [0]
+
+        def walk(work, reference, agentIndex, depth):
+            if depth == 0 or reference.isWin() or reference.isLose(): return None
+            actions = reference.getLegalActions(agentIndex)
+            for action in random.sample(actions, min(2, len(actions))):
+                before = self.snapshot(work)
+                token = work.applyMove(agentIndex, action)
+                successor = reference.generateSuccessor(agentIndex, action)
+                moves[0] += 1
+                if self.snapshot(work) != self.snapshot(successor):
+                    return 'applyMove(%d, %s) differs from generateSuccessor in\n%s' % (agentIndex, action, reference)
+                error = walk(work, successor, (agentIndex + 1) % len(successor.data.agentStates), depth - 1)
+                if error != None: return error
+                work.undoMove(token)
+                if self.snapshot(work) != before:
+                    return 'undoMove of %s by agent %d did not restore\n%s' % (action, agentIndex, reference)
+            return None
+
+        agentIndex = 0
+        for i in range(self.numStates):
+            if gameState.isWin() or gameState.isLose(): break
+            error = walk(gameState.deepCopy(), gameState, agentIndex, self.depth)
+            if error != None: return moves[0], error
+            action = agents[agentIndex].getAction(gameState.getObservation(), agentIndex) if agentIndex < len(agents) else None
+            gameState = gameState.generateMacroSuccessor(agentIndex, action)
+            agentIndex = gameState.getNextAgentIndex()
+        return moves[0], None
+
+    def execute(self, grades, moduleDict, solutionDict):
+        moves, error = self.run()
+        if error == None and moves != int(solutionDict['moves']):
+            error = '%d moves made and undone instead of %s' % (moves, solutionDict['moves'])
+        if error != None:
+            self.addMessage(error)
+            return self.testFail(grades)
+        self.addMessage('%d moves made and undone on %s' % (moves, self.layoutName))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        moves, error = self.run()
+        if error != None: raise Exception('Error in applyMove/undoMove: %s' % error)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('moves: "%d"\n' % moves)
+        handle.close()
+        return True
+
+
+def positionEvaluation(gameState):
+    "A test evaluation that depends on where every agent is, not just on the score."
+    value = gameState.getScore()
+    for index, agentState in enumerate(gameState.data.agentStates):
+        x, y = agentState.configuration.pos
+        value += (index + 1) * (3 * x + y)
+    return value
+
+
+class ExpectedValueTest(testClasses.TestCase):
+    """
+    Checks SearchAgentBase.expectedValue, which merges the enemy move orders
+    that lead to the same state, against a plain enumeration of every order of
+    random enemy moves. The states are those of a seeded random game where the
+    enemies are about to move; with evalCache the agent keeps an EvaluationCache.
+    """
+
+    def __init__(self, question, testDict):
+        super(ExpectedValueTest, self).__init__(question, testDict)
+        self.layoutName = testDict['layoutName']
+        self.seed = int(testDict['randomSeed'])
+        self.numStates = int(testDict['numStates'])
+        self.evalCache = testDict.get('evalCache', '0')
+
+    def enumerate(self, gameState, enemyIndex):
+        if enemyIndex == gameState.getNumMinMaxAgents() or gameState.isWin() or gameState.isLose():
+            return positionEvaluation(gameState)
+        distribution = RandomAgent(enemyIndex).getDistribution(gameState, enemyIndex)
+        return sum([probability * self.enumerate(gameState.generateMacroSuccessor(enemyIndex, action), enemyIndex + 1)
+                    for action, probability in distribution.items()])
+
+    def run(self):
+        "Returns (the expected values, an error message or None)."
+        from searchSupport import SearchAgentBase
+        agent = SearchAgentBase(evalCache=self.evalCache)
+        agent.evaluationFunction = positionEvaluation
+        if agent.evaluationCache != None:
+            agent.evaluationFunction = agent.evaluationCache.wrap(positionEvaluation)
+        random.seed(self.seed)
+        lay = layout.getLayout(self.layoutName)
+        gameState = GameState()
+        gameState.initialize(lay, lay.getNumEnemies())
+        ship = RandomSpaceShipAgent()
+        values = []
+        while len(values) < self.numStates and not (gameState.isWin() or gameState.isLose()):
+            agentIndex = gameState.getNextAgentIndex()
+            if agentIndex == 0:
+                gameState = gameState.generateMacroSuccessor(0, ship.getAction(gameState.getObservation(), 0))
+                if gameState.isWin() or gameState.isLose() or gameState.getNextAgentIndex() != 1: continue
+                value = agent.expectedValue(gameState)
+                correct = self.enumerate(gameState, 1)
+                if abs(value - correct) > 1e-6:
+                    return values, 'expectedValue %g instead of %g for\n%s' % (value, correct, gameState)
+                values.append(value)
+            else:
+                action = util.chooseFromDistribution(RandomAgent(agentIndex).getDistribution(gameState, agentIndex))
+                gameState = gameState.generateMacroSuccessor(agentIndex, action)
+        return values, None
+
+    def execute(self, grades, moduleDict, solutionDict):
+        values, error = self.run()
+        result = ' '.join(['%.4f' % value for value in values])
+        if error == None and result != solutionDict['values']:
+            error = 'expected values:\t%s\ncorrect values:\t\t%s' % (result, solutionDict['values'])
+        if error != None:
+            self.addMessage(error)
+            return self.testFail(grades)
+        self.addMessage('%d expected values on %s' % (len(values), self.layoutName))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        values, error = self.run()
+        if error != None: raise Exception('Error in expectedValue: %s' % error)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('values: "%s"\n' % ' '.join(['%.4f' % value for value in values]))
+        handle.close()
+        return True
+
+
+class BatchEvaluationTest(testClasses.TestCase):
+    """
+    Checks SearchAgentBase.evaluateSuccessors with the vectorized
+    featureExtractors.linearEvaluationFunction, which scores the successors of
+    a state in one call, against scoring each successor on its own. The
+    successors are evaluated twice, so that with evalCache the second round is
+    answered from the cache; the number of leaves, their total value and the
+    cache hits must match the solution.
+    """
+
+    def __init__(self, question, testDict):
+        super(BatchEvaluationTest, self).__init__(question, testDict)
+        self.layoutName = testDict['layoutName']
+        self.seed = int(testDict['randomSeed'])
+        self.numStates = int(testDict['numStates'])
+        self.evalCache = testDict.get('evalCache', '0')
+
+    def run(self):
+        "Returns (the number of leaves, their total value, the cache hits, an error message or None)."
+        from searchSupport import SearchAgentBase
+        import featureExtractors
+        evaluate = featureExtractors.linearEvaluationFunction
+        agent = SearchAgentBase.__new__(SearchAgentBase)
+        agent.evaluationFunction = evaluate
+        SearchAgentBase.__init__(agent, evalCache=self.evalCache)
+        random.seed(self.seed)
+        lay = layout.getLayout(self.layoutName)
+        gameState = GameState()
+        gameState.initialize(lay, lay.getNumEnemies())
+        agents = [RandomSpaceShipAgent()] + [RandomAgent(i + 1) for i in range(lay.getNumEnemies())]
+        leaves, total = 0, 0.0
+        for i in range(self.numStates):
+            if gameState.isWin() or gameState.isLose(): break
+            agentIndex = gameState.getNextAgentIndex()
+            actions = gameState.getLegalActions(agentIndex)
+            correct = [(action, evaluate(featureExtractors.getFeatureMatrix([gameState.generateSuccessor(agentIndex, action)]))[0])
+                       for action in actions]
+            for round in range(2):
+                values = agent.evaluateSuccessors(gameState, agentIndex)
+                if values != correct:
+                    return leaves, total, 0, 'evaluateSuccessors gave %s instead of %s for agent %d in\n%s' % (values, correct, agentIndex, gameState)
+            singles = [(action, agent.evaluationFunction(gameState.generateSuccessor(agentIndex, action))) for action in actions]
+            if singles != correct:
+                return leaves, total, 0, 'the evaluation function gave %s instead of %s for agent %d in\n%s' % (singles, correct, agentIndex, gameState)
+            leaves += len(correct)
+            total += sum([value for action, value in correct])
+            action = agents[agentIndex].getAction(gameState.getObservation(), agentIndex)
+            gameState = gameState.generateMacroSuccessor(agentIndex, action)
+        hits = agent.evaluationCache.hits if agent.evaluationCache != None else 0
+        return leaves, total, hits, None
+
+    def execute(self, grades, moduleDict, solutionDict):
+        leaves, total, hits, error = self.run()
+        result = (str(leaves), '%.4f' % total, str(hits))
+        gold = (solutionDict['leaves'], solutionDict['total'], solutionDict['cacheHits'])
+        if error == None and result != gold:
+            error = '%s leaves worth %s with %s cache hits instead of %s worth %s with %s' % (result + gold)
+        if error != None:
+            self.addMessage(error)
+            return self.testFail(grades)
+        self.addMessage('%s leaves worth %s with %s cache hits' % result)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        leaves, total, hits, error = self.run()
+        if error != None: raise Exception('Error in the batch evaluation: %s' % error)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('leaves: "%d"\n' % leaves)
+        handle.write('total: "%.4f"\n' % total)
+        handle.write('cacheHits: "%d"\n' % hits)
+        handle.close()
+        return True
+
+
+class SignatureState:
+    "Stands in for a GameState whose getSignature() is key."
+    def __init__(self, key):
+        self.key = key
+
+    def getSignature(self):
+        return self.key
+
+
+class EvaluationCacheTest(testClasses.TestCase):
+    """
+    Runs the util.EvaluationCache of an agent created with evalCache=size
+    through the operations of the test, one per line: "store key value"
+    (value None stores None), "lookup key", "evaluate key" (the agent's
+    evaluation function, which counts the states it really scores and gives
+    each key its length) or "stats" (hits/misses). The answers must match the
+    solution; a lookup that misses answers "missing".
+    """
+
+    def __init__(self, question, testDict):
+        super(EvaluationCacheTest, self).__init__(question, testDict)
+        self.size = testDict['size']
+        self.operations = testDict['operations']
+
+    def run(self):
+        "Returns the answers of the lookup, evaluate and stats operations."
+        from searchSupport import SearchAgentBase
+        evaluated = []
+        def evaluate(gameState):
+            evaluated.append(gameState.getSignature())
+            return len(gameState.getSignature())
+        agent = SearchAgentBase.__new__(SearchAgentBase)
+        agent.evaluationFunction = evaluate
+        SearchAgentBase.__init__(agent, evalCache=self.size)
+        cache = agent.evaluationCache
+        missing = object()
+        answers = []
+        for line in self.operations.split('\n'):
+            tokens = line.split()
+            if not tokens: continue
+            if tokens[0] == 'store':
+                cache.store(tokens[1], None if tokens[2] == 'None' else float(tokens[2]))
+            elif tokens[0] == 'lookup':
+                value = cache.lookup(tokens[1], missing)
+                answers.append('missing' if value is missing else str(value))
+            elif tokens[0] == 'evaluate':
+                value = agent.evaluationFunction(SignatureState(tokens[1]))
+                answers.append('%s/%d' % (value, len(evaluated)))
+            elif tokens[0] == 'stats':
+                answers.append('%d/%d' % (cache.hits, cache.misses))
+            else:
+                raise Exception('EvaluationCacheTest: unknown operation ' + line)
+        return answers
+
+    def execute(self, grades, moduleDict, solutionDict):
+        answers = self.run()
+        gold = solutionDict['answers'].split()
+        if answers != gold:
+            self.addMessage('answers:\t\t%s' % ' '.join(answers))
+            self.addMessage('correct answers:\t%s' % ' '.join(gold))
+            return self.testFail(grades)
+        self.addMessage('answers:\t%s' % ' '.join(answers))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('answers: "%s"\n' % ' '.join(self.run()))
+        handle.close()
+        return True
@@ -0,0 +1,167 @@
+"""
+searchHooks.py
+
+Instrumentation for the adversarial search agents (see searchSupport.py).
+
+Game.run asks agents for their actions through getAgentAction, which makes an
+agent's searchHook the active one while it chooses. That hook is told about
+every successor the search generates and every evaluation it makes. The
+game states do this by themselves, so search code needs no changes. SearchStats
+is the hook behind the agents' stats=FILE option. It writes one JSON line per
+move, which can be aggregated across many runs.
+"""
+
+import json
+import sys
+import time
+
+activeHook = None # the hook of the search that is running, if any
+
+
+class SearchHook:
+    """
+    Receives search events. Every method does nothing by default.
+    """
+
+    def startSearch(self, agent, gameState):
+        pass
+
+    def generated(self, gameState, ply, seconds):
+        """
+        gameState (ply moves below the root) produced a successor in seconds.
+        """
+        pass
+
+    def evaluated(self, gameState, seconds):
+        pass
+
+    def note(self, name, value):
+        """
+        Agent specific statistics of the current search.
+        """
+        pass
+
+    def endSearch(self, agent, action):
+        pass
+
+
+class SearchStats(SearchHook):
+    """
+    Counts what one search did and writes it as a JSON line to out, a file
+    name ('-' for standard output) or an open stream.
+    """
+
+    def __init__(self, out='-'):
+        self.out = out
+        self.move = 0
+
+    def startSearch(self, agent, gameState):
+        self.agentName = agent.__class__.__name__
+        self.table = getattr(agent, 'transpositionTable', None)
+        if self.table != None: self.tableCounts = (self.table.hits, self.table.misses)
+        self.cache = getattr(agent, 'evaluationCache', None)
+        if self.cache != None: self.cacheCounts = (self.cache.hits, self.cache.misses)
+        self.startTime = time.time()
+        self.numGenerated = 0
+        self.numExpanded = 0
+        self.expansionsPerPly = []
+        self.openPlies = 0 # plies whose node is still producing successors
+        self.distinctStates = set()
+        self.successorSeconds = 0.0
+        self.evalCalls = 0
+        self.evalSeconds = 0.0
+        self.notes = {}
+
+    def generated(self, gameState, ply, seconds):
+        self.numGenerated += 1
+        self.successorSeconds += seconds
+        # the successors of one node come in a row at its ply, with only deeper
+        # plies in between: a successor from a shallower ply ends the node
+        if self.openPlies <= ply:
+            self.numExpanded += 1
+            while len(self.expansionsPerPly) <= ply:
+                self.expansionsPerPly.append(0)
+            self.expansionsPerPly[ply] += 1
+        self.openPlies = ply + 1
+        self.distinctStates.add(gameState)
+
+    def evaluated(self, gameState, seconds):
+        self.evalCalls += 1
+        self.evalSeconds += seconds
+
+    def note(self, name, value):
+        self.notes[name] = value
+
+    def endSearch(self, agent, action):
+        seconds = time.time() - self.startTime
+        self.move += 1
+        self.write(self.getRecord(action, seconds))
+
+    def getRecord(self, action, seconds):
+        record = {
+            'agent': self.agentName,
+            'move': self.move,
+            'action': action,
+            'seconds': seconds,
+            'generated': self.numGenerated,
+            'expanded': self.numExpanded,
+            'nodesPerSec': self.numExpanded / seconds if seconds > 0 else 0.0,
+            'distinctStates': len(self.distinctStates),
+            'maxPly': len(self.expansionsPerPly),
+            'expansionsPerPly': self.expansionsPerPly,
+            'successorSeconds': self.successorSeconds,
+            'evalCalls': self.evalCalls,
+            'evalSeconds': self.evalSeconds,
+        }
+        if self.table != None:
+            record['ttHits'] = self.table.hits - self.tableCounts[0]
+            record['ttMisses'] = self.table.misses - self.tableCounts[1]
+        if self.cache != None:
+            hits = self.cache.hits - self.cacheCounts[0]
+            misses = self.cache.misses - self.cacheCounts[1]
+            record['evalCacheHits'] = hits
+            record['evalCacheMisses'] = misses
+            record['evalCacheHitRate'] = hits / float(hits + misses) if hits + misses > 0 else 0.0
+            record['evalCacheSize'] = len(self.cache.entries)
+        record.update(self.notes)
+        return record
+
+    def write(self, record):
+        line = json.dumps(record) + '\n'
+        if self.out == '-':
+            sys.stdout.write(line)
+        elif isinstance(self.out, str):
+            with open(self.out, 'a') as f:
+                f.write(line)
+        else:
+            self.out.write(line)
+
+
+def getAgentAction(agent, gameState, agentIndex):
+    """
+    Returns agent.getAction(gameState, agentIndex). When the agent has a
+    searchHook, the hook sees the search and the agent's evaluation function
+    calls. Game.run asks every agent for its action through here.
+    """
+    global activeHook
+    hook = getattr(agent, 'searchHook', None)
+    if hook == None:
+        return agent.getAction(gameState, agentIndex)
+
+    evaluationFunction = agent.evaluationFunction
+    def timedEvaluationFunction(state, *args):
+        startTime = time.time()
+        value = evaluationFunction(state, *args)
+        hook.evaluated(state, time.time() - startTime)
+        return value
+
+    hook.startSearch(agent, gameState)
+    activeHook = hook
+    agent.evaluationFunction = timedEvaluationFunction
+    try:
+        action = agent.getAction(gameState, agentIndex)
+    finally:
+        activeHook = None
+        agent.evaluationFunction = evaluationFunction
+    hook.endSearch(agent, action)
+    return action
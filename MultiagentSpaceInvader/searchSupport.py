@@ -0,0 +1,199 @@
+"""
+searchSupport.py
+
+The machinery behind the adversarial search agents, kept out of multiAgents.py.
+SearchAgentBase is the base class of MultiAgentSearchAgent (and of MCTSAgent)
+and reads these -a options:
+
+  ttSize=N     a util.TranspositionTable with N buckets
+  timeMs=N     iterative deepening within N milliseconds per move
+  evalCache=N  a util.EvaluationCache of the last N distinct states evaluated
+  stats=FILE   a JSON line of search statistics per move (stats=- for stdout)
+"""
+
+import time
+
+from game import Agent
+from enemyAgents import RandomAgent
+import featureExtractors
+import searchHooks
+import util
+
+_missing = object() # the EvaluationCache lookup default of states not evaluated yet
+
+
+class SearchAgentBase(Agent):
+    """
+    Options and helpers shared by the search agents. The subclass sets
+    self.evaluationFunction before calling SearchAgentBase.__init__, which may
+    wrap it.
+    """
+
+    evaluationFunction = None
+    MAX_DEPTH = 64
+
+    def __init__(self, stats = '', ttSize = '0', timeMs = '0', evalCache = '0'):
+        # evaluation functions of feature matrices (see featureExtractors.py) score
+        # whole batches in batchEvaluationFunction and single states through a wrapper
+        self.vectorizedEvaluation = None
+        if featureExtractors.isVectorized(self.evaluationFunction):
+            self.vectorizedEvaluation = self.evaluationFunction
+            self.evaluationFunction = featureExtractors.StateEvaluationFunction(self.vectorizedEvaluation)
+        # evalCache=N keeps the values of the last N distinct states evaluated (see util.EvaluationCache)
+        self.evaluationCache = util.EvaluationCache(int(evalCache)) if int(evalCache) > 0 else None
+        if self.evaluationCache != None and self.evaluationFunction != None:
+            self.evaluationFunction = self.evaluationCache.wrap(self.evaluationFunction)
+        # ttSize=N gives the search a util.TranspositionTable with N buckets (see util.py)
+        self.transpositionTable = util.TranspositionTable(int(ttSize)) if int(ttSize) > 0 else None
+        # timeMs=N searches deeper and deeper until N milliseconds have passed (see iterativeDeepening)
+        self.timeBudget = float(timeMs) / 1000.0
+        self.deadline = None
+        self.rootAction = None
+        self.killers = {}
+        self.history = util.Counter()
+        # the enemy model of expectedValue; one RandomAgent serves every enemy, as
+        # its distribution only depends on the enemy index it is given
+        self.enemyModel = RandomAgent(1)
+        # stats=FILE (or stats=- for stdout) writes a JSON line of search statistics per
+        # move; Game.run reports each getAction to it (see searchHooks.getAgentAction)
+        self.searchHook = searchHooks.SearchStats(stats) if stats != '' else None
+
+    def iterativeDeepening(self, gameState, searchRoot):
+        """
+        Anytime search driver. searchRoot(gameState, depth) must return the best
+        action for gameState searched depth deep.
+
+        Without a time budget this is just searchRoot(gameState, self.depth).
+        With one, depths 1, 2, 3, ... are searched until the budget runs out, and
+        the best action of the deepest search that finished is returned. The
+        search has to call self.checkTime() as it goes: it raises
+        util.SearchTimeout once the budget is spent, which abandons the search
+        underway. Depth 1 always finishes, so there is always an action.
+        """
+        if self.timeBudget <= 0:
+            return searchRoot(gameState, self.depth)
+
+        startTime = time.time()
+        self.killers = {}
+        self.history.divideAll(2.0)
+        self.rootAction = searchRoot(gameState, 1)
+        self.completedDepth = 1
+        self.deadline = startTime + self.timeBudget
+        try:
+            for depth in range(2, SearchAgentBase.MAX_DEPTH + 1):
+                self.rootAction = searchRoot(gameState, depth)
+                self.completedDepth = depth
+        except util.SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return self.rootAction
+
+    def checkTime(self):
+        """
+        Raises util.SearchTimeout if the time budget of this move is spent.
+        """
+        if self.deadline != None and time.time() > self.deadline:
+            raise util.SearchTimeout()
+
+    def orderActions(self, gameState, agentIndex, actions, ply):
+        """
+        Sorts actions so that the likely best ones are searched first, which
+        makes alpha-beta prune more: the previous iteration's best root action,
+        the transposition table's best action, the killer moves of this ply and
+        then actions by history score.
+        """
+        first = None
+        if ply == 0:
+            first = self.rootAction
+        elif self.transpositionTable != None:
+            first = self.transpositionTable.getBestAction(util.TranspositionTable.makeKey(gameState, agentIndex, ply))
+        killers = self.killers.get(ply, ())
+        history = self.history
+        return sorted(actions, key=lambda action: (action != first, action not in killers, -history[(agentIndex, action)]))
+
+    def recordCutoff(self, agentIndex, action, ply, depth):
+        """
+        Call when action caused a beta (or alpha) cutoff at ply with depth left;
+        it becomes a killer move of that ply and gains history score.
+        """
+        killers = self.killers.setdefault(ply, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+        self.history[(agentIndex, action)] += depth * depth
+
+    def getEnemyDistribution(self, gameState, enemyIndex):
+        """
+        The probabilities of the enemy's actions, as RandomAgent plays them.
+        """
+        return self.enemyModel.getDistribution(gameState, enemyIndex)
+
+    def batchEvaluationFunction(self, gameStates):
+        """
+        Evaluates a list of states at once. A vectorized evaluation function
+        gets the feature matrix of all of them in a single call.
+        """
+        if self.vectorizedEvaluation == None:
+            return [self.evaluationFunction(gameState) for gameState in gameStates]
+
+        cache = self.evaluationCache
+        if cache == None:
+            return self.evaluateFeatures(gameStates)
+        keys = [gameState.getSignature() for gameState in gameStates]
+        values = [cache.lookup(key, _missing) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is _missing]
+        if missing:
+            for i, value in zip(missing, self.evaluateFeatures([gameStates[i] for i in missing])):
+                values[i] = value
+                cache.store(keys[i], value)
+        return values
+
+    def evaluateFeatures(self, gameStates):
+        "Scores gameStates with the vectorized evaluation function in one call."
+        startTime = time.time()
+        values = self.vectorizedEvaluation(featureExtractors.getFeatureMatrix(gameStates))
+        hook = searchHooks.activeHook
+        if hook != None and gameStates:
+            seconds = (time.time() - startTime) / len(gameStates)
+            for gameState in gameStates:
+                hook.evaluated(gameState, seconds)
+        return values
+
+    def evaluateSuccessors(self, gameState, agentIndex, actions=None):
+        """
+        Returns [(action, value), ...] for the successors of gameState after
+        each of agentIndex's actions (all legal ones by default). Meant for the
+        last ply of a search: the leaves below one parent are generated first
+        and then scored together by batchEvaluationFunction.
+        """
+        if actions == None: actions = gameState.getLegalActions(agentIndex)
+        successors = [gameState.generateSuccessor(agentIndex, action) for action in actions]
+        return list(zip(actions, self.batchEvaluationFunction(successors)))
+
+    def expectedValue(self, gameState, firstEnemy=1):
+        """
+        Returns the expected evaluation after the enemies firstEnemy, firstEnemy+1,
+        ... each make a random move (see getEnemyDistribution), followed by the
+        bullets (see GameState.generateMacroSuccessor).
+
+        The outcomes are expanded one enemy layer at a time into a single table of
+        state -> probability, where move orders that lead to the same state are
+        merged, and all distinct outcomes are then scored with one call of
+        batchEvaluationFunction.
+        """
+        outcomes = {gameState: 1.0}
+        for enemyIndex in range(firstEnemy, gameState.getNumMinMaxAgents()):
+            nextOutcomes = {}
+            for state, probability in outcomes.items():
+                if state.isWin() or state.isLose():
+                    nextOutcomes[state] = nextOutcomes.get(state, 0.0) + probability
+                    continue
+                for action, actionProbability in self.getEnemyDistribution(state, enemyIndex).items():
+                    successor = state.generateMacroSuccessor(enemyIndex, action)
+                    nextOutcomes[successor] = nextOutcomes.get(successor, 0.0) + probability * actionProbability
+            outcomes = nextOutcomes
+
+        states = list(outcomes)
+        values = self.batchEvaluationFunction(states)
+        return sum([outcomes[state] * value for state, value in zip(states, values)])
@@ -26,19 +26,17 @@ To play your first game, type 'python spaceship.py' from the command line.
 The keys are backspace(to fire), left arrow and right arrow to move. Have fun :).
 """
 
-# import random
-import pygame
-from pygame import mixer
+import random
 import sys
+import time
 from game import GameStateData
 from game import Game
 from game import Actions
-import graphicsDisplay
 import layout
-from keyboardAgents import KeyboardAgent
+import searchHooks
 from enemyAgents import  RandomAgent
 from bulletAgents import *
-from game import AgentState, Configuration
+from game import AgentState, Configuration, AgentKinds
 from util import *
 from game import Directions
 import os
@@ -99,40 +97,187 @@ class GameState:
         """
         #checking if the successor exist
         if self.isWin() or self.isLose(): raise Exception('Can\'t generate a successor of a terminal state.')
+        if searchHooks.activeHook != None: startTime = time.time()
         #copy of current state
         state = GameState(self)
-        
-        if(agentIndex>=len(state.data.agentStates) and not state.data._win): # This is just for testing purpose
+        state.applyRules(agentIndex, action)
+
+        GameState.explored.add(self)
+        GameState.explored.add(state) # state has been updated due to action
+
+        if searchHooks.activeHook != None:
+            ply = getattr(self, 'searchPly', 0)
+            state.searchPly = ply + 1
+            searchHooks.activeHook.generated(self, ply, time.time() - startTime)
+        return state
+
+    def applyRules(self, agentIndex, action):
+        """
+        Applies the move to this state, in place (the rules behind generateSuccessor).
+        """
+        if(agentIndex>=len(self.data.agentStates) and not self.data._win): # This is just for testing purpose
             print("Warning: The game stopped due to index going out of bound need to tackle it.")
-            state.data._lose = True
-            return state
+            self.data._lose = True
+            return
 
-        state.data._agentMoved = agentIndex # _agentMoved might get changed according to further function calls
+        self.data._agentMoved = agentIndex # _agentMoved might get changed according to further function calls
         agentDestroyed = False
         if agentIndex == 0: # it is spaceship
-            SpaceShipRules.applyAction( state, action) 
+            SpaceShipRules.applyAction( self, action) 
         
-        elif state.data.agentStates[agentIndex].isUpBullet or state.data.agentStates[agentIndex].isDownBullet:
-            agentDestroyed = BulletRules.applyAction(state, action, agentIndex) 
+        elif self.data.agentStates[agentIndex].isUpBullet or self.data.agentStates[agentIndex].isDownBullet:
+            agentDestroyed = BulletRules.applyAction(self, action, agentIndex) 
         else: 
-            EnemyRules.applyAction( state, action, agentIndex) 
+            EnemyRules.applyAction( self, action, agentIndex) 
 
         # as time passes
         if agentIndex == 0:
-            state.data.scoreChange += -TIME_PENALTY # penalty for waiting around
+            self.data.scoreChange += -TIME_PENALTY # penalty for waiting around
 
         # death through bullets check
-        if not agentDestroyed: BulletRules.checkDeath(state, agentIndex)
+        if not agentDestroyed: BulletRules.checkDeath(self, agentIndex)
 
         #book keeping
-        state.data._agentDeleted = list(set(state.data._agentDeleted))
-        state.data.score += state.data.scoreChange
+        self.data._agentDeleted = list(set(self.data._agentDeleted))
+        self.data.score += self.data.scoreChange
+
+    def applyMove(self, agentIndex, action):
+        """
+        Makes the move on this state itself instead of on a new successor, and
+        returns a token that undoMove uses to restore the state exactly. This
+        state then looks just like generateSuccessor(agentIndex, action) would
+        (destroyed agents are listed in _agentDeleted, not removed).
+
+        Moves must be undone in the reverse order they were applied. Use a
+        working copy (state.deepCopy()) rather than an observation, and don't
+        keep successors generated from a working state once it changes again.
+        """
+        if self.isWin() or self.isLose(): raise Exception('Can\'t generate a successor of a terminal state.')
+        if searchHooks.activeHook != None: startTime = time.time()
+        data = self.data
+        if data._journal == None: data._journal = []
+        token = (len(data._journal), data.score, data.scoreChange, data.hashKey, data.asteroid,
+                 data._agentIndexViews, data._occupancy, data._ownsOccupancy, data._writableAgents, data._agentMoved,
+                 data._agentDeleted, data._agentsAdded, data._asteroidEaten, data._asteroidAdded, data._killedEnemy,
+                 data._win, data._lose)
+
+        data._agentDeleted = []
+        data._agentsAdded = []
+        data._asteroidEaten = None
+        data._asteroidAdded = None
+        data._killedEnemy = None
+        data.scoreChange = 0
+        data._ownsOccupancy = False # the occupancy map is copied on write rather than journaled
+        self.applyRules(agentIndex, action)
+
+        if searchHooks.activeHook != None:
+            ply = getattr(self, 'searchPly', 0)
+            self.searchPly = ply + 1
+            searchHooks.activeHook.generated(self, ply, time.time() - startTime)
+        return token
+
+    def undoMove(self, token):
+        """
+        Takes back the move that returned token (see applyMove).
+        """
+        data = self.data
+        if data._journal == None or len(data._journal) < token[0]:
+            raise Exception('Moves have to be undone in the reverse order they were made')
+        data.undoJournal(token[0])
+        (_, data.score, data.scoreChange, data.hashKey, data.asteroid,
+         data._agentIndexViews, data._occupancy, data._ownsOccupancy, data._writableAgents, data._agentMoved,
+         data._agentDeleted, data._agentsAdded, data._asteroidEaten, data._asteroidAdded, data._killedEnemy,
+         data._win, data._lose) = token
+        if searchHooks.activeHook != None:
+            self.searchPly = getattr(self, 'searchPly', 1) - 1
+
+    def generateBulletsSuccessor(self, onBulletMoved=None):
+        """
+        Physics step: returns the state after every bullet, starting from the
+        first one, has taken its forced move. The bullets move in one pass over a
+        single successor instead of one agent turn (and one state copy) each.
+
+        Bullets move in the same order and are resolved with the same rules
+        (walls, asteroid consumption, checkDeath) as the per-agent schedule, and
+        destroyed bullets are removed as soon as they die, so scores and terminal
+        states match that schedule move for move. The pass stops early if the
+        game is won or lost.
+
+        onBulletMoved(state, bulletIndex, action) is called after each bullet
+        move, with the move's bookkeeping (_agentMoved, _agentDeleted, ...) set
+        as generateSuccessor would leave it.
+        """
+        if self.isWin() or self.isLose(): raise Exception('Can\'t generate a successor of a terminal state.')
+        state = GameState(self)
+        data = state.data
+
+        firstBullet = self.getNumMinMaxAgents()
+        bulletIndex = firstBullet
+        while bulletIndex < len(data.agentStates):
+            bulletState = data.agentStates[bulletIndex]
+            action = Directions.UP if bulletState.isUpBullet else Directions.DOWN
+
+            data._agentMoved = bulletIndex
+            data._agentDeleted = []
+            data._asteroidEaten = None
+            data.scoreChange = 0
+
+            if not BulletRules.applyAction(state, action, bulletIndex):
+                BulletRules.checkDeath(state, bulletIndex)
+
+            data._agentDeleted = list(set(data._agentDeleted))
+            data.score += data.scoreChange
+            for idx in sorted(data._agentDeleted, reverse=True):
+                data.removeAgentState(idx)
+
+            if onBulletMoved != None: onBulletMoved(state, bulletIndex, action)
+            if data._win or data._lose: break
+
+            numAgents = len(data.agentStates)
+            nextIndex = (data._agentMoved % numAgents + 1) % numAgents
+            if nextIndex < firstBullet: break # wrapped around to the spaceship
+            bulletIndex = nextIndex
+
         GameState.explored.add(self)
-        GameState.explored.add(state) # state has been updated due to action 
+        GameState.explored.add(state)
+        return state
+
+    def generateMacroSuccessor(self, agentIndex, action):
+        """
+        Returns the successor state after a decision agent (the spaceship or an
+        enemy) takes the action, together with everything forced that follows it
+        before the next decision: destroyed agents are removed and, once the last
+        enemy has moved, all bullets advance (see generateBulletsSuccessor).
+
+        Bullets have exactly one legal action, so a search using this successor
+        only branches and counts depth on real decisions. The next agent to move
+        in the returned state is getNextAgentIndex(), which is always a decision
+        agent (usually agentIndex + 1, wrapping around to the spaceship).
+        """
+        state = self.generateSuccessor(agentIndex, action)
+        for idx in sorted(state.data._agentDeleted, reverse=True):
+            state.data.removeAgentState(idx)
+        if state.isWin() or state.isLose():
+            return state
 
+        nextIndex = state.getNextAgentIndex()
+        if nextIndex != 0 and nextIndex == state.getNumMinMaxAgents():
+            bulletsState = state.generateBulletsSuccessor()
+            if searchHooks.activeHook != None:
+                bulletsState.searchPly = state.searchPly
+            return bulletsState
         return state
 
 
+    def getNextAgentIndex(self):
+        """
+        Returns the index of the agent that moves after the last move made to
+        reach this state, as the Game schedules turns.
+        """
+        if self.data._agentMoved == None: return 0
+        numAgents = len(self.data.agentStates)
+        return (self.data._agentMoved % numAgents + 1) % numAgents
+
     def getSingleAsteroidLocation(self):
 
         for xNum, x in enumerate(self.data.asteroid):
@@ -162,13 +307,16 @@ class GameState:
     
     
     def getEnemyStates( self ):
-        return [state for state in self.data.agentStates if not state.isSpaceShip and not state.isUpBullet and not state.isDownBullet]
+        agentStates = self.data.agentStates
+        return [agentStates[i] for i in self.data.getAgentIndices(AgentKinds.ENEMY)]
 
     def getEnemyBulletsStates( self ):
-        return [state for state in self.data.agentStates if state.isDownBullet]
+        agentStates = self.data.agentStates
+        return [agentStates[i] for i in self.data.getAgentIndices(AgentKinds.DOWN_BULLET)]
     
     def getSpaceShipBulletsStates(self):
-        return [state for state in self.data.agentStates if state.isUpBullet]
+        agentStates = self.data.agentStates
+        return [agentStates[i] for i in self.data.getAgentIndices(AgentKinds.UP_BULLET)]
     
     
     def getAgentState(self, agentIndex):
@@ -188,7 +336,8 @@ class GameState:
         return [s.getPosition() for s in self.getEnemyStates()]
     
     def getBulletStates(self):
-        return [state for state in self.data.agentStates  if state.isUpBullet or state.isDownBullet]
+        agentStates = self.data.agentStates
+        return [agentStates[i] for i in self.data.getAgentIndices(AgentKinds.UP_BULLET, AgentKinds.DOWN_BULLET)]
     
     def getBulletPositions(self):
         return [s.getPosition() for s in self.getBulletStates()]
@@ -197,23 +346,23 @@ class GameState:
         return len(self.data.agentStates)
     
     def getNumEnemies(self):
-        return len(self.getEnemyStates())
+        return len(self.data.getAgentIndices(AgentKinds.ENEMY))
     
     def getNumEnemyBullets(self):
-        return len(self.getEnemyBulletsStates())
+        return len(self.data.getAgentIndices(AgentKinds.DOWN_BULLET))
     
     def getNumBullets(self):
-        return len(self.getBulletStates())
+        return len(self.data.getAgentIndices(AgentKinds.UP_BULLET, AgentKinds.DOWN_BULLET))
 
     
     def getMinMaxAgents(self):
-        return [idx for idx, state in enumerate(self.data.agentStates) if (not state.isUpBullet and not state.isDownBullet)]
+        return list(self.data.getAgentIndices(AgentKinds.SHIP, AgentKinds.ENEMY))
     
     def getBulletAgents(self):
-        return [idx for idx, state in enumerate(self.data.agentStates) if (state.isUpBullet or state.isDownBullet)]
+        return list(self.data.getAgentIndices(AgentKinds.UP_BULLET, AgentKinds.DOWN_BULLET))
     
     def getNumMinMaxAgents(self):
-        return len(self.getMinMaxAgents())
+        return len(self.data.getAgentIndices(AgentKinds.SHIP, AgentKinds.ENEMY))
 
     def getScore( self ):
         return float(self.data.score)
@@ -232,6 +381,21 @@ class GameState:
         if currentAsteroid[x][y] == True: ...
         """
         return self.data.asteroid
+
+    def getSignature(self):
+        """
+        Returns a compact hashable key of what the position looks like: the
+        spaceship's column, the enemy positions, the set of bullets, the
+        asteroid bitmask, the score and whether the game is won or lost. Unlike
+        the Zobrist hashKey it cannot collide.
+        """
+        data = self.data
+        agentStates = data.agentStates
+        enemies = tuple([agentStates[i].configuration.pos for i in data.getAgentIndices(AgentKinds.ENEMY)])
+        bullets = frozenset([(agentStates[i].configuration.pos, agentStates[i].kind)
+                             for i in data.getAgentIndices(AgentKinds.UP_BULLET, AgentKinds.DOWN_BULLET)])
+        return (agentStates[0].configuration.pos[0], enemies, bullets, data.asteroid.bits, data.score, data._win, data._lose)
+
     
     def getWalls(self):
         """
@@ -277,6 +441,17 @@ class GameState:
         state.data = self.data.deepCopy()
         return state
 
+    def getObservation( self ):
+        """
+        Returns a read-only view of this state for an agent. Nothing is copied:
+        the view shares its data with this state, which becomes read-only too, and
+        any attempt to change it raises. generateSuccessor still works on it.
+        """
+        self.data.freeze()
+        observation = GameState.__new__(GameState)
+        observation.data = self.data
+        return observation
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -308,11 +483,11 @@ class ClassicGameRules:
     def __init__(self):
         pass
 
-    def newGame( self, layout, sapceShipAgent, enemyAgents, display, quiet = False, catchExceptions = False):
+    def newGame( self, layout, sapceShipAgent, enemyAgents, display, quiet = False, catchExceptions = False, headless = False, bulletPhysics = False):
         agents = [sapceShipAgent] + enemyAgents[:layout.getNumEnemies()]
         initState = GameState()
         initState.initialize( layout, len(enemyAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, headless=headless, bulletPhysics=bulletPhysics)
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -351,7 +526,7 @@ class SpaceShipRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions(state, 0, state.data.layout.walls)
+        return list(state.data.layout.getLegalActions(AgentKinds.SHIP, state.data.agentStates[0].configuration.pos))
         
     getLegalActions = staticmethod(getLegalActions)
 
@@ -359,16 +534,15 @@ class SpaceShipRules:
         """
         Edits the state to reflect the results of the action.
         """
-        legal = SpaceShipRules.getLegalActions( state )
+        legal = state.data.layout.getLegalActions(AgentKinds.SHIP, state.data.agentStates[0].configuration.pos)
         if action not in legal:
             raise Exception("Illegal action " + str(action))
         
         # here state is gamestate 
-        spaceShipState = state.data.agentStates[0]
-
         if action in [Directions.LEFT, Directions.RIGHT, Directions.STOP]:
+            spaceShipState = state.data.agentStates[0]
             vector = Actions.actionToVector(action,SpaceShipRules.SPACESHIP_SPEED)
-            spaceShipState.configuration = spaceShipState.configuration.generateSuccessor(vector)
+            state.data.setAgentConfiguration(0, spaceShipState.configuration.generateSuccessor(vector))
         elif action == Directions.FIRE:
             SpaceShipRules.fire(state) 
 
@@ -383,7 +557,7 @@ class SpaceShipRules:
         x, y = spaceshipPosition
         bullet = AgentState(Configuration((x, y-1)), False, True, False) #, Directions.STOP
         state.data._agentsAdded.append(UpBulletAgent(len(state.data.agentStates))) 
-        state.data.agentStates.append(bullet)
+        state.data.addAgentState(bullet)
 
     fire = staticmethod(fire)
 
@@ -398,22 +572,23 @@ class EnemyRules:
         Returns legal actions for an enemy with enemyIndex.
         """
         enemyState = state.getEnemyState( enemyIndex )
-        possibleActions = Actions.getPossibleActions(state, enemyIndex, state.data.layout.walls) 
-        return possibleActions
+        possibleActions = state.data.layout.getLegalActions(enemyState.kind, enemyState.configuration.pos)
+        return list(possibleActions)
     
     getLegalActions = staticmethod(getLegalActions)
 
     def applyAction( state, action, enemyIndex ): 
-        legal = EnemyRules.getLegalActions(state, enemyIndex)
+        enemyState = state.getEnemyState( enemyIndex )
+        legal = state.data.layout.getLegalActions(enemyState.kind, enemyState.configuration.pos)
         if action not in legal:
             raise Exception("Illegal Enemy action " + str(action))
         
-        enemyState = state.data.agentStates[enemyIndex]
         speed = EnemyRules.ENEMY_SPEED
 
         if action in [Directions.UP, Directions.DOWN, Directions.LEFT, Directions.RIGHT, Directions.STOP]:
+            enemyState = state.data.agentStates[enemyIndex]
             vector = Actions.actionToVector(action, speed)
-            enemyState.configuration = enemyState.configuration.generateSuccessor( vector )
+            state.data.setAgentConfiguration(enemyIndex, enemyState.configuration.generateSuccessor( vector ))
         elif action == Directions.FIRE:
             EnemyRules.fire(state, enemyIndex) 
 
@@ -425,13 +600,13 @@ class EnemyRules:
         x, y = enemyPosition
         bullet = AgentState(Configuration((x, y+1)), False, False, True)
         state.data._agentsAdded.append(DownBulletAgent(len(state.data.agentStates))) 
-        state.data.agentStates.append(bullet) 
+        state.data.addAgentState(bullet)
 
     fire = staticmethod(fire)
 
 
-    def placeEnemy(state, enemyState):
-        enemyState.configuration = enemyState.start
+    def placeEnemy(state, enemyIndex):
+        state.data.setAgentConfiguration(enemyIndex, state.data.agentStates[enemyIndex].start)
 
     placeEnemy = staticmethod(placeEnemy)
 
@@ -442,25 +617,25 @@ class BulletRules:
     These functions govern how bullets interact with their environment.
     """
     BULLET_SPEED = 1
+    VERIFY_OCCUPANCY = False # differential test mode: check every collision lookup against a full scan
 
     def getLegalActions(state, bulletIndex):
         """
         Spaceship's(Up) bullets moves upward.
         Enemy's(Down) bullets moves downward.
         """
-        if state.data.agentStates[bulletIndex].isUpBullet:
-            return [Directions.UP]
-        else: return [Directions.DOWN]
+        bulletState = state.data.agentStates[bulletIndex]
+        return list(state.data.layout.getLegalActions(bulletState.kind, bulletState.configuration.pos))
 
     getLegalActions = staticmethod(getLegalActions)
     
     def applyAction(state, action, bulletIndex): 
 
-        bulletState = state.data.agentStates[bulletIndex]
         speed = BulletRules.BULLET_SPEED
         # Update configuration
         vector = Actions.actionToVector(action, speed)
-        bulletState.configuration = bulletState.configuration.generateSuccessor(vector)
+        state.data.setAgentConfiguration(bulletIndex, state.data.agentStates[bulletIndex].configuration.generateSuccessor(vector))
+        bulletState = state.data.agentStates[bulletIndex]
 
         next = bulletState.configuration.getPosition()
         nearest = nearestPoint( next )
@@ -492,8 +667,7 @@ class BulletRules:
 
         if state.data.asteroid[x][y]:
             state.data.scoreChange += 100
-            state.data.asteroid = state.data.asteroid.copy()
-            state.data.asteroid[x][y] = False
+            state.data.removeAsteroid(position)
             state.data._asteroidEaten = position
 
 
@@ -516,7 +690,7 @@ class BulletRules:
         state.data._agentMoved = agentIndex
         if agentState.isSpaceShip: # spaceship just moved so down bullets can kill it
             spaceshipPosition = agentState.configuration.getPosition()
-            for index in range(len(state.data.agentStates)):
+            for index in BulletRules.getCollisionCandidates(state, spaceshipPosition):
                 ast = state.data.agentStates[index]
                 aPos = ast.configuration.getPosition()
                 if ast.isDownBullet:
@@ -528,7 +702,7 @@ class BulletRules:
 
         elif agentState.isUpBullet: # bullet moved so can kill enemy or down bullet
             upbulletPosition = agentState.configuration.getPosition()
-            for index in range(len(state.data.agentStates)):
+            for index in BulletRules.getCollisionCandidates(state, upbulletPosition):
                 bst = state.data.agentStates[index]
                 bPos = bst.configuration.getPosition()
                 if bst.isDownBullet:
@@ -542,15 +716,15 @@ class BulletRules:
                 elif not bst.isSpaceShip and not bst.isUpBullet and not bst.isDownBullet: #enemy
                     if BulletRules.canHit(upbulletPosition, bPos):
                         # need to placeEnemy or respawn it
-                        EnemyRules.placeEnemy(state, state.data.agentStates[index])
-                        state.data._killed[index] = True
+                        EnemyRules.placeEnemy(state, index)
+                        state.data.markKilled(index)
                         state.data._agentMoved -= 1
                         state.data._agentDeleted.append(agentIndex)
                         state.data.scoreChange += 100
 
         elif agentState.isDownBullet: #bullet moved so can kill spaceship or up bullet
             downbulletPosition = agentState.configuration.getPosition()
-            for index in range(len(state.data.agentStates)):
+            for index in BulletRules.getCollisionCandidates(state, downbulletPosition):
                 bst = state.data.agentStates[index]
                 bPos = bst.configuration.getPosition()
                 if bst.isUpBullet:
@@ -574,14 +748,14 @@ class BulletRules:
                     
         else:
             enemyPosition = agentState.configuration.getPosition()
-            for index in range(len(state.data.agentStates)):
+            for index in BulletRules.getCollisionCandidates(state, enemyPosition):
                 bst = state.data.agentStates[index]
                 bPos = bst.configuration.getPosition()
                 if bst.isUpBullet:
                     if BulletRules.canHit(enemyPosition, bPos):
                         #need to respawn the enemy
-                        EnemyRules.placeEnemy(state, state.data.agentStates[agentIndex])
-                        state.data._killed[agentIndex] = True
+                        EnemyRules.placeEnemy(state, agentIndex)
+                        state.data.markKilled(agentIndex)
                         state.data._agentMoved -= 1
                         state.data._agentDeleted.append(index)
                         state.data.scoreChange += 100
@@ -589,6 +763,23 @@ class BulletRules:
             
 
 
+    def getCollisionCandidates(state, position):
+        """
+        Returns, in index order, the agents that canHit position. Only the agents
+        around position in the occupancy map are tested, not every agent.
+        """
+        agentStates = state.data.agentStates
+        candidates = [index for index in state.data.getAgentsNear(position)
+                      if BulletRules.canHit(position, agentStates[index].configuration.getPosition())]
+        if BulletRules.VERIFY_OCCUPANCY:
+            scanned = [index for index in range(len(agentStates))
+                       if BulletRules.canHit(position, agentStates[index].configuration.getPosition())]
+            if scanned != candidates:
+                raise Exception("Occupancy map found %s near %s, full scan found %s" % (candidates, position, scanned))
+        return candidates
+
+    getCollisionCandidates = staticmethod(getCollisionCandidates)
+
     def canHit(aPos, bPos):
         return manhattanDistance(aPos, bPos) <= 0.75
 
@@ -649,12 +840,18 @@ def readCommand( argv ):
     parser.add_option('-t', '--textGraphics', action='store_true', dest='textGraphics',
                       help='Display output as text only', default=False)
     parser.add_option('-q', '--quietTextGraphics', action='store_true', dest='quietGraphics',
-                      help='Generate minimal output and no graphics', default=False)
+                      help='Generate minimal output and no graphics, running games headless (no pygame, no frame rate cap)', default=False)
+    parser.add_option('-b', '--bulletPhysics', action='store_true', dest='bulletPhysics',
+                      help='Move all bullets in one physics step per round instead of one agent turn each', default=False)
     parser.add_option('-e', '--enemy', dest='enemy',
                       help=default('the agent TYPE in the enemyAgents module to use'),
                       metavar='TYPE', default='RandomAgent')
     parser.add_option('-z', '--zoom', type='float', dest='zoom',
                       help=default('Zoom the size of the graphics window'), default=1.0)
+    parser.add_option('-w', '--workers', type='int', dest='workers',
+                      help=default('the number of worker processes to play the GAMES on (runs headless)'), default=1)
+    parser.add_option('--seed', dest='seed',
+                      help='the random SEED every game derives its own seed from', metavar='SEED', default=None)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
 
@@ -668,6 +865,9 @@ def readCommand( argv ):
     args['layout'] = layout.getLayout(options.layout)
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
+    # Parallel games have no window to draw in
+    if options.workers > 1: options.quietGraphics = True
+
     # Choose a Spaceship agent
     noKeyboard = options.textGraphics or options.quietGraphics
     spaceshipType = loadAgent(options.spaceship, noKeyboard)
@@ -682,6 +882,8 @@ def readCommand( argv ):
 
 
     # # Choose a display format
+    args['headless'] = options.quietGraphics
+    args['bulletPhysics'] = options.bulletPhysics
     if options.quietGraphics:
         import textDisplay
         args['display'] = textDisplay.NullGraphics()
@@ -694,6 +896,8 @@ def readCommand( argv ):
 
 
     args['numGames'] = options.numGames
+    args['workers'] = options.workers
+    args['seed'] = options.seed
 
     return args
 
@@ -724,18 +928,44 @@ def loadAgent(spaceship, nographics):
     raise Exception('The agent ' + spaceship + ' is not specified in any *Agents.py.')
 
 
-def run_games(spaceship, numGames, enemy, layout, display):
-    
+def gameSeed(seed, gameIndex):
+    """
+    The random seed of game number gameIndex, derived from the run's seed.
+    """
+    return '%s:%d' % (seed, gameIndex)
+
+def runGameJob(job):
+    """
+    Plays one game of a parallel run in a worker process, headless and with
+    its own derived seed.
+    """
+    gameIndex, seed, spaceship, enemy, layout, bulletPhysics = job
+    import textDisplay
+    random.seed(gameSeed(seed, gameIndex))
     rules = ClassicGameRules()
-    games = []
+    game = rules.newGame(layout, spaceship, enemy, textDisplay.NullGraphics(), quiet=True, headless=True, bulletPhysics=bulletPhysics)
+    game.run()
+    return gameIndex, game
 
-    for i in range( numGames ):
+def run_games(spaceship, numGames, enemy, layout, display, headless=False, bulletPhysics=False, workers=1, seed=None):
 
-        gameDisplay = display
+    if workers > 1:
+        startTime = time.time()
+        games = run_parallel_games(spaceship, numGames, enemy, layout, workers, bulletPhysics, seed)
+        wallTime = time.time() - startTime
+        headless = True
+    else:
+        rules = ClassicGameRules()
+        games = []
+
+        for i in range( numGames ):
 
-        game = rules.newGame(layout, spaceship, enemy, gameDisplay)
-        game.run()
-        games.append(game)
+            gameDisplay = display
+            if seed != None: random.seed(gameSeed(seed, i))
+
+            game = rules.newGame(layout, spaceship, enemy, gameDisplay, headless=headless, bulletPhysics=bulletPhysics)
+            game.run()
+            games.append(game)
 
     scores = [game.state.getScore() for game in games]
     wins = [game.state.isWin() for game in games]
@@ -744,9 +974,38 @@ def run_games(spaceship, numGames, enemy, layout, display):
     print('Scores:       ', ', '.join([str(score) for score in scores]))
     print('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate))
     print('Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins]))
+    if headless:
+        numMoves = sum([game.numMoves for game in games])
+        if workers > 1:
+            # the games overlap, so their own times would add up to more than the run took
+            print('Moves/sec:     %.1f (%d moves in %.2fs wall clock on %d workers)' % (numMoves / max(wallTime, 1e-9), numMoves, wallTime, workers))
+        else:
+            elapsedTime = sum([game.elapsedTime for game in games])
+            print('Moves/sec:     %.1f (%d moves in %.2fs)' % (numMoves / max(elapsedTime, 1e-9), numMoves, elapsedTime))
 
     return games
 
+def run_parallel_games(spaceship, numGames, enemy, layout, workers, bulletPhysics=False, seed=None):
+    """
+    Plays the games on a pool of worker processes and returns them in game
+    order. Every game is seeded from (seed, game number), so a run can be
+    repeated with any number of workers, or sequentially with the same --seed.
+    Results are printed as the games finish.
+    """
+    import multiprocessing
+
+    if seed == None:
+        seed = random.randrange(2 ** 32)
+    print('Playing %d games on %d workers (seed %s)' % (numGames, workers, seed))
+
+    jobs = [(i, seed, spaceship, enemy, layout, bulletPhysics) for i in range(numGames)]
+    games = [None] * numGames
+    with multiprocessing.Pool(workers) as pool:
+        for i, game in pool.imap_unordered(runGameJob, jobs):
+            games[i] = game
+            print('Game %d: %s, Score: %d' % (i + 1, ['Loss', 'Win'][int(game.state.isWin())], game.state.getScore()))
+    return games
+
 
 if __name__ == '__main__':
     """
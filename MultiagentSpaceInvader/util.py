@@ -15,6 +15,7 @@
 import sys
 import inspect
 import heapq, random
+import collections
 
 
 class FixedRandom:
@@ -207,6 +208,149 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+class TranspositionTable:
+    """
+      A fixed size table of search results, for game tree searches that reach
+      the same position through different move orders.
+
+      Each entry stores the value found for a position, the depth it was
+      searched to and whether the value is EXACT, a LOWER bound (the search
+      failed high) or an UPPER bound (it failed low), plus the best action.
+      Every bucket has two slots: one keeps the deepest result seen and the
+      other always takes the newest result.
+
+        table = TranspositionTable(1024)
+        key = TranspositionTable.makeKey(gameState, agentIndex, ply)
+        table.store(key, depth, value, TranspositionTable.EXACT, action)
+        table.lookup(key, depth, alpha, beta)  # the value, or None
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def  __init__(self, size=65536):
+        self.size = size
+        self.deepSlots = [None] * size
+        self.newSlots = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def makeKey(gameState, agentIndex, ply):
+        """
+        A key for gameState with agentIndex to move, ply moves below the root.
+        The same position at another ply is a different entry, since the turn
+        order (and with it the bullet moves still to come) differs.
+        """
+        return (gameState.data.hashKey, gameState.data.score, agentIndex, ply)
+
+    makeKey = staticmethod(makeKey)
+
+    def getEntry(self, key):
+        "Returns the (key, depth, value, bound, action) entry of key, or None."
+        bucket = hash(key) % self.size
+        entry = self.deepSlots[bucket]
+        if entry != None and entry[0] == key: return entry
+        entry = self.newSlots[bucket]
+        if entry != None and entry[0] == key: return entry
+        return None
+
+    def lookup(self, key, depth, alpha=float('-inf'), beta=float('inf')):
+        """
+        Returns the stored value of key if it was searched at least depth deep
+        and its bound settles the (alpha, beta) window, otherwise None.
+        """
+        entry = self.getEntry(key)
+        if entry != None and entry[1] >= depth:
+            (_, _, value, bound, _) = entry
+            if bound == TranspositionTable.EXACT or \
+               (bound == TranspositionTable.LOWER and value >= beta) or \
+               (bound == TranspositionTable.UPPER and value <= alpha):
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def getBestAction(self, key):
+        "Returns the best action stored for key, or None."
+        entry = self.getEntry(key)
+        if entry == None: return None
+        return entry[4]
+
+    def store(self, key, depth, value, bound=EXACT, action=None):
+        bucket = hash(key) % self.size
+        entry = (key, depth, value, bound, action)
+        deepest = self.deepSlots[bucket]
+        if deepest == None or deepest[0] == key or depth >= deepest[1]:
+            self.deepSlots[bucket] = entry
+        else:
+            self.newSlots[bucket] = entry
+
+    def clear(self):
+        self.deepSlots = [None] * self.size
+        self.newSlots = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+_missing = object() # what EvaluationCache.lookup finds for a key it does not hold
+
+class EvaluationCache:
+    """
+      A bounded least recently used cache of evaluation function values,
+      keyed by GameState.getSignature(). Once it holds size entries, storing a
+      new one drops the entry that went unused the longest.
+
+        cache = EvaluationCache(100000)
+        evaluationFunction = cache.wrap(evaluationFunction)
+    """
+    def  __init__(self, size=100000):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, default=None):
+        "Returns the value stored for key, or default if there is none."
+        value = self.entries.get(key, _missing)
+        if value is _missing:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        entries = self.entries
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def wrap(self, evaluationFunction):
+        "Returns evaluationFunction, answering repeated states from the cache."
+        return CachedEvaluationFunction(self, evaluationFunction)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+class CachedEvaluationFunction:
+    """
+      An evaluation function that answers from an EvaluationCache first. A
+      class rather than a closure so that agents using it can be pickled.
+    """
+    def __init__(self, cache, evaluationFunction):
+        self.cache = cache
+        self.evaluationFunction = evaluationFunction
+
+    def __call__(self, gameState):
+        key = gameState.getSignature()
+        value = self.cache.lookup(key, _missing)
+        if value is _missing:
+            value = self.evaluationFunction(gameState)
+            self.cache.store(key, value)
+        return value
+
 def semiManhattanDistance(xy1, xy2):
     return abs(xy1[0]-xy2[0])
 
@@ -599,6 +743,10 @@ class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
     pass
 
+class SearchTimeout(Exception):
+    """Raised by an agent's own search when its per-move time budget runs out"""
+    pass
+
 
 class TimeoutFunction:
     def __init__(self, function, timeout):
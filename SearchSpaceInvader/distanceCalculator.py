@@ -0,0 +1,72 @@
+"""
+Maze distances for a layout.
+
+mazeDistance (searchAgents.py) is the cost of the plan a breadth first search
+finds for a PositionSearchProblem. Every step of that problem costs the same, so
+a single breadth first search from a start state gives the distance to every
+state reachable from it. A Distancer runs that search the first time a start
+state is asked about and answers every later query with a lookup. Only the
+states reachable from the starts actually asked about are stored, which for
+the spaceship is its own row of the board.
+"""
+
+from collections import deque
+
+
+class Distancer:
+    """
+    The distances of the search problems of one set of walls, by start state.
+    """
+
+    def __init__(self):
+        self.distances = {} # start state -> {state: number of steps}
+
+    def getDistances(self, problem):
+        """
+        Returns {state: number of steps} for every state reachable from the start
+        state of problem.
+        """
+        start = problem.getStartState()
+        distances = self.distances.get(start)
+        if distances == None:
+            distances = self.distances[start] = breadthFirstDistances(problem)
+        return distances
+
+    def getDistance(self, problem, goal):
+        """
+        Returns the number of steps from the start state of problem to goal, or
+        float('inf') when goal cannot be reached.
+        """
+        return self.getDistances(problem).get(goal, float('inf'))
+
+
+def breadthFirstDistances(problem):
+    """
+    Breadth first search over the whole state space reachable from the start
+    state of problem. Step costs are ignored: every step counts as one.
+    """
+    start = problem.getStartState()
+    distances = {start: 0}
+    frontier = deque([start])
+    while frontier:
+        state = frontier.popleft()
+        nextDistance = distances[state] + 1
+        for successor, action, stepCost in problem.getSuccessors(state):
+            if successor not in distances:
+                distances[successor] = nextDistance
+                frontier.append(successor)
+    return distances
+
+
+_distancers = {} # (width, height, wall bits) -> Distancer
+
+def getDistancer(walls):
+    """
+    Returns the (shared) Distancer of a set of walls. Distancers are keyed by
+    the walls rather than by a layout object, so every copy of a layout shares one.
+    """
+    key = (walls.width, walls.height, walls.bits)
+    distancer = _distancers.get(key)
+    if distancer == None:
+        distancer = _distancers[key] = Distancer()
+    return distancer
@@ -1,9 +1,18 @@
-import pygame
 from util import *
 import copy
 
-clock = pygame.time.Clock()
-pygame.init()
+# pygame is only imported (and initialized) once a game runs, so that the
+# layouts, grids and search code can be used without it.
+pygame = None
+clock = None
+
+def initPygame():
+    global pygame, clock
+    if pygame == None:
+        import pygame as pygameModule
+        pygameModule.init()
+        clock = pygameModule.time.Clock()
+        pygame = pygameModule
 
 class Directions:
     LEFT = "Left"
@@ -210,6 +219,164 @@ class Grid:
                 bools.append(False)
         return bools
 
+class BitGrid:
+    """
+    A drop-in replacement for Grid backed by a single python int used as a bitboard.
+    Cell (x, y) lives at bit x * height + y, which is the same cell order used by
+    Grid.packBits and Grid.__hash__, so both kinds of grid hash alike.
+
+    Data is still accessed via grid[x][y]; grid[x] returns a light column view
+    that reads and writes bits of its parent. Since the bits are an immutable int,
+    copy() is O(1), count() is a popcount and asList() only visits set bits.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.bits = (1 << (width * height)) - 1 if initialValue else 0
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def fromGrid(grid):
+        """
+        Builds a BitGrid holding the same cells as a list-of-lists Grid.
+        """
+        g = BitGrid(grid.width, grid.height)
+        for x, y in grid.asList():
+            g.bits |= 1 << (x * grid.height + y)
+        return g
+
+    fromGrid = staticmethod(fromGrid)
+
+    def fromBits(width, height, bits):
+        """
+        Builds a BitGrid around an int bitmask with bit x * height + y per cell.
+        """
+        g = BitGrid(width, height)
+        g.bits = bits
+        return g
+
+    fromBits = staticmethod(fromBits)
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.width:
+            if -self.width <= i < 0: i += self.width
+            else: raise IndexError('BitGrid column index out of range')
+        return _BitGridColumn(self, i * self.height)
+
+    def __setitem__(self, key, item):
+        column = self[key]
+        for y in range(self.height):
+            column[y] = item[y]
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield _BitGridColumn(self, x * self.height)
+
+    def __len__(self):
+        return self.width
+
+    def __str__(self):
+        out = [[str(self[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        if isinstance(other, BitGrid):
+            return self.bits == other.bits and self.width == other.width and self.height == other.height
+        if isinstance(other, Grid):
+            return other.width == self.width and other.height == self.height and other.asList() == self.asList()
+        return False
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def copy(self):
+        g = BitGrid.__new__(BitGrid)
+        g.CELLS_PER_INT = self.CELLS_PER_INT
+        g.width = self.width
+        g.height = self.height
+        g.bits = self.bits
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # ints are immutable so there is nothing to share: writes made through the
+        # copy never leak back into this grid (which is what every caller wants).
+        return self.copy()
+
+    def count(self, item =True ):
+        ones = bin(self.bits).count('1')
+        if item: return ones
+        return self.width * self.height - ones
+
+    def asList(self, key = True):
+        if not key:
+            return Grid.asList(self, False)
+        list = []
+        bits = self.bits
+        height = self.height
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            list.append( (index // height, index % height) )
+            bits ^= low
+        return list
+
+    def packBits(self):
+        return Grid.packBits(self)
+
+    def _cellIndexToPosition(self, index):
+        x = index // self.height
+        y = index % self.height
+        return x, y
+
+    def _unpackBits(self, bits):
+        Grid._unpackBits(self, bits)
+
+    def _unpackInt(self, packed, size):
+        return Grid._unpackInt(self, packed, size)
+
+
+class _BitGridColumn:
+    """
+    A view of column x of a BitGrid, so that grid[x][y] reads and writes single bits.
+    """
+    __slots__ = ('grid', 'offset')
+
+    def __init__(self, grid, offset):
+        self.grid = grid
+        self.offset = offset
+
+    def _row(self, y):
+        # rows index like list items: negative rows count from the end
+        height = self.grid.height
+        if 0 <= y < height: return y
+        if -height <= y < 0: return y + height
+        raise IndexError('BitGrid row index out of range')
+
+    def __getitem__(self, y):
+        y = self._row(y)
+        return (self.grid.bits >> (self.offset + y)) & 1 == 1
+
+    def __setitem__(self, y, item):
+        y = self._row(y)
+        if item: self.grid.bits |= 1 << (self.offset + y)
+        else: self.grid.bits &= ~(1 << (self.offset + y))
+
+    def __iter__(self):
+        column = self.grid.bits >> self.offset
+        for y in range(self.grid.height):
+            yield (column >> y) & 1 == 1
+
+    def __len__(self):
+        return self.grid.height
+
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -467,6 +634,7 @@ class Game:
         Main control loop for game play.
         """
 
+        initPygame()
         self.display.initialize(self.state.data)
         self.numMoves = 0
 
@@ -3,8 +3,7 @@ For different layouts of the game
 """
 import copy
 from util import *
-from game import Grid
-import pygame
+from game import BitGrid
 from queue import Queue
 import math
 
@@ -17,10 +16,10 @@ class Layout:
     def __init__(self, layoutText):
         self.width = len(layoutText[0])
         self.height = len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
+        self.walls = BitGrid(self.width, self.height, False)
         self.agentPositions = []
         self.numEnemies = 0
-        self.asteroid = Grid(self.width, self.height, False)
+        self.asteroid = BitGrid(self.width, self.height, False)
         self.processLayoutText(layoutText)
         self.enemies = []
         self.layoutText = layoutText
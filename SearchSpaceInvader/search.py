@@ -4,6 +4,9 @@ SpaceShip agents (in searchAgents.py).
 """
 
 import util
+import json
+import sys
+import time
 
 class SearchProblem:
     """
@@ -97,9 +100,322 @@ def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic):
     "*** YOUR CODE HERE ***"
     util.raiseNotDefined()
 
+def iterativeDeepeningAStar(problem: SearchProblem, heuristic=nullHeuristic):
+    """
+    Search the node that has the lowest combined cost and heuristic first, in
+    memory that grows with the depth of the solution rather than with the
+    state space (IDA*).
+
+    Runs depth-first searches that cut off the nodes whose cost plus heuristic
+    is above a bound, and raises the bound to the smallest value that was cut
+    off until a goal is found. Only the states on the current path are checked
+    for cycles, so a state may be expanded many times.
+    """
+    start = problem.getStartState()
+    bound = heuristic(start, problem)
+    problem._peakFrontier = 0
+    while bound != None:
+        nextBound = None
+        path = [[start, 0, None]] # [state, cost, successors not tried yet]
+        onPath = set([start])
+        actions = []
+        waiting = 0 # successors generated but not tried yet
+        while path:
+            node = path[-1]
+            state, cost, successors = node
+            if successors == None:
+                f = cost + heuristic(state, problem)
+                if f > bound:
+                    if nextBound == None or f < nextBound: nextBound = f
+                    successors = []
+                elif problem.isGoalState(state):
+                    return actions
+                else:
+                    successors = problem.getSuccessors(state)[::-1]
+                    waiting += len(successors)
+                    problem._peakFrontier = max(problem._peakFrontier, len(path) + waiting)
+                node[2] = successors
+
+            if successors:
+                successor, action, stepCost = successors.pop()
+                waiting -= 1
+                if successor not in onPath:
+                    path.append([successor, cost + stepCost, None])
+                    onPath.add(successor)
+                    actions.append(action)
+            else:
+                path.pop()
+                onPath.discard(state)
+                if path: actions.pop()
+        bound = nextBound
+    return []
+
+MEMORY_BOUND = 10000 # nodes memoryBoundedAStar keeps by default
+REGENERATION_BOUND = 50 # forgotten subtrees it may regenerate per node kept, by default
+
+class MemoryBoundedNode:
+    """
+    A node of the search tree of memoryBoundedAStar. forgotten is the lowest f
+    of the children it dropped to stay within the memory bound, if any.
+    """
+    def __init__(self, state, parent, action, cost, f, serial):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.cost = cost
+        self.f = f
+        self.serial = serial
+        self.depth = 0 if parent == None else parent.depth + 1
+        self.children = []
+        self.forgotten = None
+
+    def getActions(self):
+        actions = []
+        node = self
+        while node.parent != None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+def memoryBoundedAStar(problem: SearchProblem, heuristic=nullHeuristic, maxNodes=MEMORY_BOUND, maxRegenerations=None):
+    """
+    Search the node that has the lowest combined cost and heuristic first,
+    keeping at most maxNodes nodes in memory between expansions (a simplified
+    SMA*).
+
+    When the bound is passed, the leaf with the highest cost plus heuristic
+    (the shallowest one on ties) is dropped and its parent remembers that
+    value, so the subtree is only generated again once everything cheaper has
+    been tried. A single path longer than maxNodes is still kept whole.
+
+    When maxNodes is far too small for the problem, the search spends its time
+    dropping and generating the same subtrees again. After maxRegenerations of
+    them (REGENERATION_BOUND * maxNodes by default) it raises instead.
+    """
+    maxNodes = int(maxNodes)
+    if maxRegenerations == None: maxRegenerations = REGENERATION_BOUND * maxNodes
+    regenerations = 0
+    start = problem.getStartState()
+    root = MemoryBoundedNode(start, None, None, 0, heuristic(start, problem), 0)
+    frontier = util.IndexedPriorityQueue() # nodes to expand, lowest f first, deepest on ties
+    leaves = util.IndexedPriorityQueue()   # the childless ones, highest f first, shallowest on ties
+    known = {start: root} # state -> the cheapest node in memory that reaches it
+    serial = size = 1
+    problem._peakFrontier = 1
+
+    def queue(node):
+        frontier.push(node, (node.f, -node.depth, node.serial))
+        if not node.children: leaves.push(node, (-node.f, node.depth, -node.serial))
+
+    def removeChild(node):
+        node.parent.children.remove(node)
+        if known.get(node.state) is node: del known[node.state]
+
+    queue(root)
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        if node in leaves: leaves.remove(node)
+        if problem.isGoalState(node.state):
+            return node.getActions()
+
+        # the children still in memory are dominated by themselves and skipped
+        if node.forgotten != None:
+            regenerations += 1
+            if regenerations > maxRegenerations:
+                raise Exception('memoryBoundedAStar: maxNodes=%d is too small for this problem '
+                                '(%d forgotten subtrees generated again); raise maxNodes' % (maxNodes, regenerations - 1))
+        node.forgotten = None
+        for successor, action, stepCost in problem.getSuccessors(node.state):
+            cost = node.cost + stepCost
+            other = known.get(successor)
+            if other != None and other.cost <= cost: continue
+            child = MemoryBoundedNode(successor, node, action, cost, cost + heuristic(successor, problem), serial)
+            serial += 1
+            node.children.append(child)
+            known[successor] = child
+            queue(child)
+            size += 1
+        problem._peakFrontier = max(problem._peakFrontier, size)
+
+        # a dead end is dropped along with the ancestors it leaves childless
+        while not node.children and node.forgotten == None and node.parent != None:
+            removeChild(node)
+            size -= 1
+            node = node.parent
+            if not node.children and node.forgotten != None: queue(node)
+
+        # a parent that forgot children is queued again with the best f it forgot
+        while size > maxNodes and len(leaves) > 1:
+            worst = leaves.pop()
+            frontier.remove(worst)
+            removeChild(worst)
+            size -= 1
+            parent = worst.parent
+            if parent.forgotten == None or worst.f < parent.forgotten: parent.forgotten = worst.f
+            parent.f = parent.forgotten
+            queue(parent)
+    return []
+
+
+##########################
+# Search instrumentation #
+##########################
+
+activeHook = None # the hook of the search that is running, if any
+
+class SearchHook:
+    """
+    Receives the events of a search run by runSearch. Every method does
+    nothing by default.
+    """
+
+    def startSearch(self, problem):
+        pass
+
+    def expanded(self, state, successors, seconds):
+        """
+        problem.getSuccessors(state) returned successors in seconds.
+        """
+        pass
+
+    def heuristicCalled(self, state, seconds):
+        pass
+
+    def endSearch(self, problem, actions):
+        pass
+
+
+class SearchStats(SearchHook):
+    """
+    Measures one search and writes it as a JSON line to out, a file name ('-'
+    for standard output) or an open stream. info is added to the record, e.g.
+    the names of the search function and heuristic.
+
+    The frontier is taken to be the distinct states generated but not expanded
+    yet, which is what a graph search keeps; a search function that counts its
+    own peak in problem._peakFrontier (idastar, smastar) is trusted instead.
+    """
+
+    def __init__(self, out='-', info={}):
+        self.out = out
+        self.info = info
+
+    def startSearch(self, problem):
+        self.startTime = time.time()
+        self.numExpanded = 0
+        self.depths = {problem.getStartState(): 0} # state -> depth it was first generated at
+        self.closed = set()
+        self.frontier = self.peakFrontier = 1
+        self.expansionsPerDepth = []
+        self.successorSeconds = 0.0
+        self.heuristicCalls = 0
+        self.heuristicSeconds = 0.0
+
+    def expanded(self, state, successors, seconds):
+        self.numExpanded += 1
+        self.successorSeconds += seconds
+        depth = self.depths.setdefault(state, 0)
+        if state not in self.closed:
+            self.closed.add(state)
+            self.frontier -= 1
+        while len(self.expansionsPerDepth) <= depth:
+            self.expansionsPerDepth.append(0)
+        self.expansionsPerDepth[depth] += 1
+
+        for successor, action, stepCost in successors:
+            if successor not in self.depths:
+                self.depths[successor] = depth + 1
+                self.frontier += 1
+        self.peakFrontier = max(self.peakFrontier, self.frontier)
+
+    def heuristicCalled(self, state, seconds):
+        self.heuristicCalls += 1
+        self.heuristicSeconds += seconds
+
+    def endSearch(self, problem, actions):
+        seconds = time.time() - self.startTime
+        self.write(self.getRecord(problem, actions, seconds))
+
+    def getRecord(self, problem, actions, seconds):
+        record = {
+            'problem': problem.__class__.__name__,
+            'pathLength': len(actions) if actions != None else None,
+            'seconds': seconds,
+            'expanded': self.numExpanded,
+            'nodesPerSec': self.numExpanded / seconds if seconds > 0 else 0.0,
+            'peakFrontier': getattr(problem, '_peakFrontier', self.peakFrontier),
+            'closedSetSize': len(self.closed),
+            'maxDepth': len(self.expansionsPerDepth),
+            'expansionsPerDepth': self.expansionsPerDepth,
+            'successorSeconds': self.successorSeconds,
+            'heuristicCalls': self.heuristicCalls,
+            'heuristicSeconds': self.heuristicSeconds,
+        }
+        record.update(self.info)
+        return record
+
+    def write(self, record):
+        line = json.dumps(record) + '\n'
+        if self.out == '-':
+            sys.stdout.write(line)
+        elif isinstance(self.out, str):
+            with open(self.out, 'a') as f:
+                f.write(line)
+        else:
+            self.out.write(line)
+
+
+def runSearch(searchFunction, problem, hook=None):
+    """
+    Returns searchFunction(problem), telling hook about the search: every
+    problem.getSuccessors call and, while it runs, every call to a heuristic
+    wrapped by instrumentHeuristic. The search function needs no changes.
+    """
+    global activeHook
+    if hook == None:
+        return searchFunction(problem)
+
+    getSuccessors = problem.getSuccessors
+    ownGetSuccessors = 'getSuccessors' in vars(problem) # rather than the class's method
+    def timedGetSuccessors(state):
+        startTime = time.time()
+        successors = getSuccessors(state)
+        hook.expanded(state, successors, time.time() - startTime)
+        return successors
+
+    hook.startSearch(problem)
+    problem.getSuccessors = timedGetSuccessors
+    activeHook = hook
+    try:
+        actions = searchFunction(problem)
+    finally:
+        activeHook = None
+        if ownGetSuccessors:
+            problem.getSuccessors = getSuccessors
+        else:
+            del problem.getSuccessors
+    hook.endSearch(problem, actions)
+    return actions
+
+def instrumentHeuristic(heuristic):
+    """
+    Wraps heuristic so that the hook of the running search sees its calls.
+    """
+    def instrumentedHeuristic(state, problem=None):
+        if activeHook == None:
+            return heuristic(state, problem)
+        startTime = time.time()
+        value = heuristic(state, problem)
+        activeHook.heuristicCalled(state, time.time() - startTime)
+        return value
+    return instrumentedHeuristic
+
 
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+idastar = iterativeDeepeningAStar
+smastar = memoryBoundedAStar
@@ -20,10 +20,14 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import Configuration
+from game import BitGrid
 import util
 import time
+import functools
 import search
 import spaceship
+import distanceCalculator
 
 
 #######################################################
@@ -114,6 +118,42 @@ class SearchAgent(Agent):
         else:
             return Directions.STOP
 
+class InstrumentedSearchAgent(SearchAgent):
+    """
+    A SearchAgent with options for the searches added to search.py. fn, prob
+    and heuristic are the same as for SearchAgent, and in addition
+
+      maxNodes=N  sets the node budget of memoryBoundedAStar (smastar)
+      stats=FILE  appends a JSON line of search statistics to FILE ('-' prints it)
+
+    python spaceship.py -l layout7 -s InstrumentedSearchAgent -a fn=smastar,maxNodes=500,stats=-
+    """
+
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', maxNodes=None, stats=''):
+        SearchAgent.__init__(self, fn, prob, heuristic)
+
+        # SearchAgent checked the names, so only the options are left to add
+        func = getattr(search, fn)
+        usesHeuristic = 'heuristic' in func.__code__.co_varnames
+        if maxNodes != None:
+            if 'maxNodes' not in func.__code__.co_varnames:
+                raise AttributeError(fn + ' does not take a maxNodes node budget.')
+            func = functools.partial(func, maxNodes=int(maxNodes))
+        searchInfo = {'fn': fn}
+        if not usesHeuristic:
+            searchFunction = func
+        else:
+            heur = globals()[heuristic] if heuristic in globals() else getattr(search, heuristic)
+            if stats != '': heur = search.instrumentHeuristic(heur)
+            searchInfo['heuristic'] = heuristic
+            searchFunction = lambda x: func(x, heuristic=heur)
+
+        if stats == '':
+            self.searchFunction = searchFunction
+        else:
+            hook = search.SearchStats(stats, searchInfo)
+            self.searchFunction = lambda x: search.runSearch(searchFunction, x, hook)
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -441,6 +481,86 @@ class AsteroidSearchProblem:
         return cost
 
 
+class AsteroidBitmaskSearchProblem(AsteroidSearchProblem):
+    """
+    AsteroidSearchProblem on a compact encoding of its states, for searches
+    that want O(1) successors and hashing. Opt in with
+    -a prob=AsteroidBitmaskSearchProblem,heuristic=asteroidBitmaskHeuristic
+
+    A search state in this problem is a tuple ( spaceshipX, asteroidBits ) where
+      spaceshipX:   the x coordinate of Spaceship, which never leaves its row
+      asteroidBits: an int bitmask of the remaining asteroid, with bit x * height + y
+                    set when there is an asteroid at (x, y)
+    getGridState(state) converts a state to the ( spaceshipPosition, asteroidGrid )
+    form of AsteroidSearchProblem. Successors, costs and expansion order are the same.
+    """
+    def __init__(self, startingGameState: spaceship.GameState):
+        AsteroidSearchProblem.__init__(self, startingGameState)
+        x, self.y = startingGameState.getSpaceShipPosition()
+        self.start = (int(x), startingGameState.getAsteroid().bits)
+        self.height = self.walls.height
+
+        # the column-top index: asteroidBits & fireMasks[x] holds the asteroids a shot
+        # from column x can reach (rows 1 to y), and its highest bit is the one it eats
+        rows = ((1 << (int(self.y) + 1)) - 1) & ~1
+        self.fireMasks = [rows << (column * self.height) for column in range(self.walls.width)]
+
+    def isGoalState(self, state):
+        return state[1] == 0
+
+    def getSuccessors(self, state):
+        "Returns successor states, the actions they require, and a cost of 1."
+        successors = []
+        self._expanded += 1 # DO NOT CHANGE
+
+        x, asteroidBits = state
+        for action in [Directions.LEFT, Directions.RIGHT, Directions.FIRE, Directions.STOP]:
+            ((dx, dy), fire) = Actions.actionToVector(action)
+            nextx, nexty = int(x + dx), int(self.y + dy)
+
+            if self.walls[nextx][nexty]: 
+                continue 
+
+            if(fire):
+                successors.append(((nextx, asteroidBits & ~self.getFireTarget(nextx, asteroidBits)), action, 1))
+            else:
+                successors.append(((nextx, asteroidBits), action, 1))
+
+        return successors
+
+    def getFireTarget(self, x, asteroidBits):
+        """
+        Returns the bit of the asteroid a shot from column x eats, or 0 if it eats
+        none, without scanning the column.
+        """
+        column = asteroidBits & self.fireMasks[x]
+        if column == 0: return 0
+        return 1 << (column.bit_length() - 1)
+
+    def getGridState(self, state):
+        """
+        Returns state as a tuple ( spaceshipPosition, asteroidGrid ), where
+        asteroidGrid is a Grid (see game.py) of either True or False.
+        """
+        x, asteroidBits = state
+        asteroid = self.startingGameState.getAsteroid()
+        return ((x, self.y), BitGrid.fromBits(asteroid.width, asteroid.height, asteroidBits))
+
+    def getCostOfActions(self, actions):
+        """Returns the cost of a particular sequence of actions. If those actions
+        include an illegal move, return 999999"""
+        x, y = self.getStartState()[0], self.y
+        cost = 0
+        for action in actions:
+            # figure out the next state and see whether it's legal
+            dx, dy = Actions.actionToVector(action)[0]
+            x, y = int(x + dx), int(y + dy)
+            if self.walls[x][y]: 
+                return 999999
+            cost += 1
+        return cost
+
+
 class AStarAsteroidSearchAgent(SearchAgent):
     "A SearchAgent for AsteroidSearchProblem using A* and your asteroidHeuristic"
     def __init__(self):
@@ -479,23 +599,29 @@ def asteroidHeuristic(state, problem: AsteroidSearchProblem):
     "*** YOUR CODE HERE ***"
     return 0
 
+def asteroidBitmaskHeuristic(state, problem: AsteroidBitmaskSearchProblem):
+    """
+    Your asteroidHeuristic, for the states of AsteroidBitmaskSearchProblem.
+    """
+    return asteroidHeuristic(problem.getGridState(state), problem)
+
 
 class ClosestDotSearchAgent(SearchAgent):
     "Search for all asteroid using a sequence of searches"
     def registerInitialState(self, state):
         self.actions = []
+        planner = AsteroidPlanner(state)
         currentState = state
-        
-        while(currentState.getAsteroid().count() > 0):
+        searchState = planner.getStartState()
+
+        while(planner.hasTarget(searchState)):
             nextPathSegment = self.findPathToClosestDot(currentState) # The missing piece
             self.actions += nextPathSegment
-            for action in nextPathSegment:
-                legal = currentState.getLegalActions()
-
-                if action not in legal:
-                    break
-
-                currentState = currentState.generateSuccessor(0, action)
+            nextSearchState = planner.follow(searchState, nextPathSegment)
+            if nextSearchState[1] == searchState[1]:
+                break # the segment shot nothing, the next one would be the same
+            searchState = nextSearchState
+            currentState = planner.getGameState(searchState)
 
         self.actionIndex = 0
         print('Path found with cost %d.' % len(self.actions))
@@ -552,14 +678,79 @@ class AnyAsteroidSearchProblem(PositionSearchProblem):
 
 
 
+class AsteroidPlanner:
+    """
+    Follows the spaceship through a sequence of path segments on the compact
+    state (spaceship x, asteroid bitmask), where bit x * height + y is set when
+    there is an asteroid at (x, y), instead of generating a GameState per action.
+
+    The spaceship never leaves its row, so what the planner needs from the layout
+    is worked out once and reused by every segment: the stretch of that row it can
+    get to and the asteroids it can shoot from there. Shots are resolved with the
+    column-top index of AsteroidBitmaskSearchProblem.
+    """
+    def __init__(self, startingGameState: spaceship.GameState):
+        self.startingGameState = startingGameState
+        self.problem = AsteroidBitmaskSearchProblem(startingGameState)
+        self.walls = self.problem.walls
+        self.y = self.problem.y
+        self.startX = self.problem.getStartState()[0]
+
+        # the asteroids that can be shot from the stretch of the row around the spaceship
+        y = int(self.y)
+        left = right = self.startX
+        while left > 0 and not self.walls[left - 1][y]: left -= 1
+        while right < self.walls.width - 1 and not self.walls[right + 1][y]: right += 1
+        self.reachableMask = 0
+        for column in range(left, right + 1):
+            self.reachableMask |= self.problem.fireMasks[column]
+
+    def getStartState(self):
+        return self.problem.getStartState()
+
+    def hasTarget(self, searchState):
+        """
+        Returns whether the spaceship can still shoot an asteroid from a column
+        it can get to.
+        """
+        return searchState[1] & self.reachableMask != 0
+
+    def follow(self, searchState, actions):
+        """
+        Returns the search state the spaceship gets to by taking actions from
+        searchState. It stops at the first action that would hit a wall.
+        """
+        x, asteroidBits = searchState
+        y = int(self.y)
+        for action in actions:
+            ((dx, dy), fire) = Actions.actionToVector(action)
+            if self.walls[int(x + dx)][y]: break
+            x = int(x + dx)
+            if fire: asteroidBits &= ~self.problem.getFireTarget(x, asteroidBits)
+        return (x, asteroidBits)
+
+    def getGameState(self, searchState):
+        """
+        Returns a copy of the starting GameState with the spaceship and the
+        asteroids moved to searchState, for the next findPathToClosestDot.
+        """
+        x, asteroidBits = searchState
+        gameState = spaceship.GameState(self.startingGameState)
+        gameState.data.agentStates[0].configuration = Configuration((x, self.y))
+        gameState.data.asteroid.bits = asteroidBits
+        return gameState
+
+
 def mazeDistance(point1, point2, gameState: spaceship.GameState) -> int:
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built. The gameState can be any game state -- SpaceShip's
-    position in that state is ignored.
+    Returns the maze distance between any two points, as the cost of the plan
+    a breadth first search finds for a PositionSearchProblem. The gameState can
+    be any game state -- SpaceShip's position in that state is ignored.
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
+    The distances from a start state are searched once and then looked up
+    (see distanceCalculator.py).
     This might be a useful helper function for your ApproximateSearchAgent.
     """
     x1, y1 = point1
@@ -568,4 +759,4 @@ def mazeDistance(point1, point2, gameState: spaceship.GameState) -> int:
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1) 
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2) 
     prob = PositionSearchProblem(gameState,  goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
\ No newline at end of file
+    return distanceCalculator.getDistancer(walls).getDistance(prob, prob.goal)
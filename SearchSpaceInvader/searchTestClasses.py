@@ -227,6 +227,36 @@ class GraphSearchTest(testClasses.TestCase):
 
 
 
+class MemoryBoundedSearchTest(GraphSearchTest):
+    """
+    GraphSearchTest for the node budgeted searches of search.py. maxNodes and
+    maxRegenerations, when given, are passed on to the algorithm, and a search
+    that gives up on its budget has the solution "error".
+    """
+
+    def __init__(self, question, testDict):
+        super(MemoryBoundedSearchTest, self).__init__(question, testDict)
+        self.options = {}
+        for name in ['maxNodes', 'maxRegenerations']:
+            if name in testDict:
+                self.options[name] = int(testDict[name])
+
+    def getSolInfo(self, search):
+        algorithm = getattr(search, self.algorithm)
+        problem = GraphSearch(self.graphText)
+        heuristic = self.heuristic if self.heuristic != None else search.nullHeuristic
+        try:
+            solution = algorithm(problem, heuristic, **self.options)
+        except Exception as e:
+            if 'too small' not in str(e): raise
+            return ['error'], problem.getExpandedStates(), None
+
+        if type(solution) != type([]):
+            return None, None, 'The result of %s must be a list. (Instead, it is %s)' % (self.algorithm, type(solution))
+
+        return solution, problem.getExpandedStates(), None
+
+
 class SpaceShipSearchTest(testClasses.TestCase):
 
     def __init__(self, question, testDict):
@@ -780,3 +810,116 @@ class ClosestDotTest(testClasses.TestCase):
         handle.write('solution_length: "%s"\n' % length)
         handle.close()
         return True
+
+
+class IndexedPriorityQueueTest(testClasses.TestCase):
+    """
+    Runs util.IndexedPriorityQueue through the operations of the test, one per
+    line: "push item priority", "update item priority", "remove item" or "pop".
+    The items popped must match the solution, and after every operation the heap
+    and its item index must still agree. With numOperations, that many random
+    operations (from randomSeed) are checked against a sorted list instead.
+    """
+
+    def __init__(self, question, testDict):
+        super(IndexedPriorityQueueTest, self).__init__(question, testDict)
+        self.operations = testDict.get('operations', '')
+        self.numOperations = int(testDict.get('numOperations', '0'))
+        self.randomSeed = int(testDict.get('randomSeed', '0'))
+
+    def checkInvariant(self, queue):
+        heap = queue.heap
+        if len(queue.index) != len(heap):
+            return 'the index holds %d items and the heap %d' % (len(queue.index), len(heap))
+        for slot, (priority, count, item) in enumerate(heap):
+            if queue.index.get(item) != slot:
+                return 'item %s is in heap slot %d but indexed at %s' % (item, slot, queue.index.get(item))
+            if slot > 0 and heap[slot] < heap[(slot - 1) // 2]:
+                return 'heap slot %d is smaller than its parent' % slot
+        return None
+
+    def runOperations(self):
+        "Returns (the items popped, an error message or None)."
+        import util
+        queue = util.IndexedPriorityQueue()
+        popped = []
+        for line in self.operations.split('\n'):
+            tokens = line.split()
+            if not tokens: continue
+            if tokens[0] == 'push': queue.push(tokens[1], float(tokens[2]))
+            elif tokens[0] == 'update': queue.update(tokens[1], float(tokens[2]))
+            elif tokens[0] == 'remove': queue.remove(tokens[1])
+            elif tokens[0] == 'pop': popped.append(queue.pop())
+            else: raise Exception('IndexedPriorityQueueTest: unknown operation ' + line)
+            error = self.checkInvariant(queue)
+            if error != None:
+                return popped, 'after "%s": %s' % (line.strip(), error)
+        return popped, None
+
+    def runRandomOperations(self):
+        "Returns an error message, or None when every operation matched the model."
+        import random
+        import util
+        rng = random.Random(self.randomSeed)
+        queue = util.IndexedPriorityQueue()
+        model = {} # item -> (priority, insertion count)
+        count = 0
+        for i in range(self.numOperations):
+            operation = rng.choice(['push', 'push', 'update', 'remove', 'pop'])
+            item = rng.randrange(50)
+            priority = rng.randrange(20)
+            if operation == 'push':
+                queue.push(item, priority)
+                model[item] = (priority, model[item][1] if item in model else count)
+                count += 1
+            elif operation == 'update':
+                queue.update(item, priority)
+                if item not in model:
+                    model[item] = (priority, count)
+                    count += 1
+                elif priority < model[item][0]:
+                    model[item] = (priority, model[item][1])
+            elif operation == 'remove' and item in model:
+                queue.remove(item)
+                del model[item]
+            elif operation == 'pop' and model:
+                expected = min(model, key=lambda key: model[key])
+                item = queue.pop()
+                if item != expected:
+                    return 'operation %d: popped %s instead of %s' % (i, item, expected)
+                del model[item]
+            else:
+                continue
+            error = self.checkInvariant(queue)
+            if error == None and (len(queue) != len(model) or any(queue.getPriority(key) != model[key][0] for key in model)):
+                error = 'the queued priorities differ from the model'
+            if error != None:
+                return 'operation %d (%s %s): %s' % (i, operation, item, error)
+        return None
+
+    def execute(self, grades, moduleDict, solutionDict):
+        popped, error = self.runOperations()
+        if error == None and self.numOperations > 0:
+            error = self.runRandomOperations()
+        if error != None:
+            grades.addMessage('FAIL: %s' % self.path)
+            grades.addMessage('\t%s' % error)
+            return False
+        gold = solutionDict['popped'].split()
+        if popped != gold:
+            grades.addMessage('FAIL: %s' % self.path)
+            grades.addMessage('\tpopped:\t\t%s' % ' '.join(popped))
+            grades.addMessage('\tcorrect popped:\t%s' % ' '.join(gold))
+            return False
+        grades.addMessage('PASS: %s' % self.path)
+        grades.addMessage('\tpopped:\t%s' % ' '.join(popped))
+        return True
+
+    def writeSolution(self, moduleDict, filePath):
+        popped, error = self.runOperations()
+        if error != None: raise Exception("Error in util.IndexedPriorityQueue: %s" % error)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('popped: "%s"\n' % ' '.join(popped))
+        handle.close()
+        return True
@@ -27,15 +27,11 @@ The keys are backspace(to fire), left arrow and right arrow to move. Have fun :)
 """
 
 # import random
-import pygame
-from pygame import mixer
 import sys
 from game import GameStateData
 from game import Game
 from game import Actions
-import graphicsDisplay
 import layout
-from keyboardAgents import KeyboardAgent
 from enemyAgents import  RandomAgent
 from bulletAgents import *
 from game import AgentState, Configuration
@@ -191,6 +191,108 @@ class PriorityQueue:
         else:
             self.push(item, priority)
 
+class IndexedPriorityQueue:
+    """
+      A PriorityQueue that keeps a map from each item to its slot in the
+      heap. Membership tests are O(1) and update lowers an item's priority in
+      O(log n) in place, instead of scanning and re-heapifying.
+
+      Items must be hashable and are kept unique: pushing an item that is
+      already queued just sets its priority. Ties pop in insertion order, as
+      in PriorityQueue.
+    """
+    def  __init__(self):
+        self.heap = []
+        self.index = {}
+        self.count = 0
+
+    def push(self, item, priority):
+        if item in self.index:
+            slot = self.index[item]
+            (_, c, _) = self.heap[slot]
+            self.heap[slot] = (priority, c, item)
+            self._siftDown(self._siftUp(slot))
+            return
+        self.heap.append((priority, self.count, item))
+        self.index[item] = len(self.heap) - 1
+        self.count += 1
+        self._siftUp(len(self.heap) - 1)
+
+    def pop(self):
+        (_, _, item) = self.heap[0]
+        last = self.heap.pop()
+        del self.index[item]
+        if self.heap:
+            self.heap[0] = last
+            self.index[last[2]] = 0
+            self._siftDown(0)
+        return item
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def update(self, item, priority):
+        # Same contract as PriorityQueue.update: only ever lowers a queued item's priority.
+        if item in self.index:
+            slot = self.index[item]
+            (p, c, _) = self.heap[slot]
+            if p <= priority:
+                return
+            self.heap[slot] = (priority, c, item)
+            self._siftUp(slot)
+        else:
+            self.push(item, priority)
+
+    def remove(self, item):
+        slot = self.index.pop(item)
+        last = self.heap.pop()
+        if slot < len(self.heap):
+            self.heap[slot] = last
+            self.index[last[2]] = slot
+            self._siftDown(self._siftUp(slot))
+
+    def getPriority(self, item):
+        return self.heap[self.index[item]][0]
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _siftUp(self, slot):
+        heap, index = self.heap, self.index
+        entry = heap[slot]
+        while slot > 0:
+            parent = (slot - 1) >> 1
+            if not entry < heap[parent]:
+                break
+            heap[slot] = heap[parent]
+            index[heap[slot][2]] = slot
+            slot = parent
+        heap[slot] = entry
+        index[entry[2]] = slot
+        return slot
+
+    def _siftDown(self, slot):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[slot]
+        while True:
+            child = 2 * slot + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry:
+                break
+            heap[slot] = heap[child]
+            index[heap[slot][2]] = slot
+            slot = child
+        heap[slot] = entry
+        index[entry[2]] = slot
+        return slot
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the